@@ -19,6 +19,7 @@ Estructura de datos a extraer:
 """
 
 import asyncio
+import concurrent.futures
 import json
 import os
 import re
@@ -26,11 +27,12 @@ import sqlite3
 from dataclasses import dataclass, asdict, field
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from bs4 import BeautifulSoup
 
 try:
-    from playwright.async_api import async_playwright, Browser, Page
+    from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Route
     PLAYWRIGHT_AVAILABLE = True
 except ImportError:
     PLAYWRIGHT_AVAILABLE = False
@@ -39,6 +41,115 @@ except ImportError:
     print("   playwright install chromium")
 
 
+# ============================================================================
+# NORMALIZACIÓN DE PRECIOS (en lote)
+# ============================================================================
+
+# Separador del lote: ningún precio lleva un carácter NUL
+_BATCH_SEP = '\x00'
+_NON_DIGIT_RE = re.compile(r'[^\d\x00]')
+
+
+def _strip_non_digits(prices: List[str]) -> List[str]:
+    """Deja solo los dígitos de cada precio con UNA sustitución sobre el lote unido"""
+    return _NON_DIGIT_RE.sub('', _BATCH_SEP.join(prices)).split(_BATCH_SEP)
+
+# Un solo patrón para todos los precios de una tarjeta: grupo 1 = prefijo "Desde:"
+_PRICE_SCAN_RE = re.compile(r'(Desde[:\s]*)?\$[\d.,]+', re.IGNORECASE)
+
+
+def _prices_to_numbers(prices: List[Optional[str]]) -> List[Optional[float]]:
+    """
+    Convierte una lista de precios string a números en una sola pasada.
+    
+    🎓 PROCESO:
+    ["$10.300", None, "$65.000"] → ["10300", "", "65000"] → [10300.0, None, 65000.0]
+    
+    Los precios se unen en un solo string: la regex limpia todo el lote
+    en una llamada y numpy convierte los dígitos a float de una vez.
+    """
+    if not prices:
+        return []
+    digits = np.array(_strip_non_digits([p or '' for p in prices]))
+    mask = digits != ''
+    valores = np.zeros(len(digits), dtype=float)
+    valores[mask] = digits[mask].astype(float)
+    return [float(v) if m else None for v, m in zip(valores, mask)]
+
+
+def _find_prices(text: str) -> List[Tuple[int, int, bool]]:
+    """
+    Recorre el texto UNA sola vez y devuelve los precios como offsets.
+    
+    🎓 RESULTADO:
+    "Desde: $65.000 Antes $80.000" → [(7, 14, True), (21, 28, False)]
+    (inicio, fin, venía precedido de "Desde")
+    """
+    return [(m.start() + len(m.group(1) or ''), m.end(), m.group(1) is not None)
+            for m in _PRICE_SCAN_RE.finditer(text)]
+
+
+def normalize_prices(productos: List["Producto"]):
+    """Calcula precio.valor_numerico de todos los productos en un solo lote"""
+    valores = _prices_to_numbers([p.precio.desde for p in productos])
+    for p, valor in zip(productos, valores):
+        p.precio.valor_numerico = valor
+
+
+# ============================================================================
+# ESQUEMA SQLITE
+# ============================================================================
+
+_SQLITE_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS productos (
+        id TEXT PRIMARY KEY,
+        nombre TEXT NOT NULL,
+        categoria_principal TEXT,
+        subcategoria TEXT,
+        precio_desde TEXT,
+        precio_categoria_a TEXT,
+        precio_categoria_b TEXT,
+        precio_categoria_c TEXT,
+        precio_no_afiliado TEXT,
+        valor_numerico REAL,
+        descripcion TEXT,
+        url TEXT,
+        imagen_url TEXT,
+        promocion INTEGER,
+        fecha_limite_promocion TEXT,
+        fecha_scraping TEXT
+    )
+'''
+
+_SQLITE_INSERT = '''
+    INSERT OR REPLACE INTO productos VALUES (
+        ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
+    )
+'''
+
+
+def _sqlite_row(p: "Producto") -> tuple:
+    """Fila de la tabla productos, en el orden de columnas de _SQLITE_SCHEMA"""
+    return (
+        p.id,
+        p.nombre,
+        p.categoria_principal,
+        p.subcategoria,
+        p.precio.desde,
+        p.precio.categoria_a,
+        p.precio.categoria_b,
+        p.precio.categoria_c,
+        p.precio.no_afiliado,
+        p.precio.valor_numerico,
+        p.descripcion,
+        p.url,
+        p.imagen_url,
+        1 if p.promocion else 0,
+        p.fecha_limite_promocion,
+        p.fecha_scraping
+    )
+
+
 # ============================================================================
 # ESTRUCTURAS DE DATOS
 # ============================================================================
@@ -52,6 +163,7 @@ class Precio:
     categoria_c: Optional[str] = None    # Precio para afiliados categoría C
     no_afiliado: Optional[str] = None    # Precio para no afiliados
     valor_numerico: Optional[float] = None  # Valor numérico para ordenar
+    es_desde: bool = False               # True si la card decía "Desde:" (precio mínimo)
 
 
 @dataclass
@@ -72,6 +184,10 @@ class Producto:
     def to_dict(self) -> dict:
         d = asdict(self)
         return d
+    
+    @classmethod
+    def from_dict(cls, d: dict) -> "Producto":
+        return cls(**{**d, 'precio': Precio(**d['precio'])})
 
 
 # ============================================================================
@@ -130,18 +246,34 @@ class CompensarPlaywrightScraper:
         "turismo",
     ]
     
-    def __init__(self, headless: bool = True, slow_mo: int = 0):
+    # Productos acumulados antes de escribirlos a SQLite en una transacción
+    STREAM_BATCH_SIZE = 200
+    
+    # Recursos que no aportan datos: se cancelan antes de descargarse
+    BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+    
+    def __init__(self, headless: bool = True, slow_mo: int = 0,
+                 executable_path: Optional[str] = None):
         """
         Inicializa el scraper.
         
         Args:
             headless: True = navegador invisible, False = ver navegador
             slow_mo: Milisegundos de retraso entre acciones (para debug)
+            executable_path: Chrome/Chromium a lanzar en vez del descargado
+                por Playwright (p. ej. el Chrome de Windows desde WSL)
         """
         self.headless = headless
         self.slow_mo = slow_mo
+        self.executable_path = executable_path
         self.browser: Optional[Browser] = None
+        self.context: Optional[BrowserContext] = None
         self.productos: List[Producto] = []
+        self._pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        # Salida incremental, abierta solo mientras scrape_all(stream_dir=...) corre
+        self._jsonl = None
+        self._stream_db: Optional[sqlite3.Connection] = None
+        self._pending_rows: List[tuple] = []
         
     async def start(self):
         """Inicia el navegador"""
@@ -149,18 +281,132 @@ class CompensarPlaywrightScraper:
         self.playwright = await async_playwright().start()
         self.browser = await self.playwright.chromium.launch(
             headless=self.headless,
-            slow_mo=self.slow_mo
+            slow_mo=self.slow_mo,
+            executable_path=self.executable_path
         )
+        # Un contexto compartido por todas las pestañas, con el filtro de
+        # recursos instalado una sola vez
+        self.context = await self.new_context()
+        # Pool de procesos para parsear HTML sin bloquear el event loop
+        self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=4)
         print("✅ Navegador iniciado")
         
     async def stop(self):
         """Cierra el navegador"""
+        if self.context:
+            await self.context.close()
+            self.context = None
         if self.browser:
             await self.browser.close()
         if hasattr(self, 'playwright'):
             await self.playwright.stop()
+        if self._pool:
+            self._pool.shutdown()
+            self._pool = None
+        self._close_stream()
         print("🛑 Navegador cerrado")
     
+    async def new_context(self) -> "BrowserContext":
+        """
+        Crea un contexto del navegador (cookies y caché propios) con el
+        filtro de recursos ya instalado.
+        
+        🎓 Un solo Chromium, muchos contextos: abrir un contexto cuesta
+        milisegundos, lanzar otro navegador cuesta segundos.
+        """
+        context = await self.browser.new_context(
+            extra_http_headers={"Accept-Encoding": "gzip, deflate, br"}
+        )
+        await context.route("**/*", self._block_resources)
+        return context
+    
+    async def _block_resources(self, route: "Route"):
+        """
+        Cancela imágenes, fuentes y video; deja pasar todo lo demás.
+        
+        🎓 Para extraer precios solo hace falta el HTML, el JS y el CSS
+        (el hover de precios A/B/C depende del layout). Las URLs de las
+        imágenes siguen en el atributo src aunque no se descarguen.
+        """
+        if route.request.resource_type in self.BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+    
+    # ========================================================================
+    # SALIDA INCREMENTAL (JSONL + SQLite por lotes)
+    # ========================================================================
+    
+    def _open_stream(self, output_dir: Path):
+        """
+        Abre productos.jsonl y compensar.db en output_dir para ir guardando.
+        
+        🎓 Si el scraping se interrumpe, lo ya escrito se conserva: cada
+        subcategoría terminada queda en el JSONL, y en SQLite cada lote de
+        STREAM_BATCH_SIZE productos.
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        # 'w': el JSONL corresponde solo a esta ejecución (SQLite sí acumula)
+        self._jsonl = open(output_dir / "productos.jsonl", 'w', encoding='utf-8')
+        self._stream_db = sqlite3.connect(output_dir / "compensar.db")
+        self._stream_db.execute('PRAGMA journal_mode=WAL')
+        self._stream_db.execute(_SQLITE_SCHEMA)
+        self._pending_rows = []
+    
+    def _stream(self, productos: List[Producto]):
+        """Escribe una subcategoría terminada al JSONL y encola sus filas SQLite"""
+        normalize_prices(productos)
+        self._jsonl.write(''.join(
+            json.dumps(p.to_dict(), ensure_ascii=False) + '\n' for p in productos
+        ))
+        self._jsonl.flush()
+        
+        self._pending_rows.extend(_sqlite_row(p) for p in productos)
+        if len(self._pending_rows) >= self.STREAM_BATCH_SIZE:
+            self._flush_rows()
+    
+    def _flush_rows(self):
+        """Inserta las filas pendientes con executemany en una sola transacción"""
+        if self._pending_rows:
+            with self._stream_db:
+                self._stream_db.executemany(_SQLITE_INSERT, self._pending_rows)
+            self._pending_rows = []
+    
+    def _close_stream(self):
+        """Vacía el último lote y cierra los archivos de salida"""
+        if self._stream_db:
+            self._flush_rows()
+            self._stream_db.close()
+            self._stream_db = None
+        if self._jsonl:
+            self._jsonl.close()
+            self._jsonl = None
+    
+    @staticmethod
+    def iter_jsonl(filepath: str):
+        """Recorre un productos.jsonl producto a producto (como dicts)"""
+        with open(filepath, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    
+    @classmethod
+    def jsonl_to_json(cls, jsonl_path: str, filepath: str):
+        """
+        Convierte productos.jsonl en el mismo productos.json que save_to_json,
+        línea a línea (sin cargar todo en memoria).
+        """
+        os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write('[')
+            i = -1
+            for i, d in enumerate(cls.iter_jsonl(jsonl_path)):
+                item = json.dumps(d, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+                f.write((',\n  ' if i else '\n  ') + item)
+            f.write('\n]' if i >= 0 else ']')
+        
+        print(f"💾 Guardado en: {filepath}")
+    
     def _extract_price(self, text: str) -> Optional[str]:
         """
         Extrae precio de un texto.
@@ -173,24 +419,11 @@ class CompensarPlaywrightScraper:
         - "$10.300" → "$10.300"
         - "Desde: $65.000" → "$65.000"
         """
-        match = re.search(r'\$[\d.,]+', text)
-        return match.group() if match else None
-    
-    def _price_to_number(self, price_str: str) -> Optional[float]:
-        """
-        Convierte precio string a número.
-        
-        🎓 PROCESO:
-        "$10.300" → "10300" → 10300.0
-        """
-        if not price_str:
-            return None
-        # Remover $ y convertir formato colombiano
-        clean = re.sub(r'[^\d]', '', price_str)
-        try:
-            return float(clean)
-        except:
+        prices = _find_prices(text)
+        if not prices:
             return None
+        start, end, _ = prices[0]
+        return text[start:end]
     
     async def _wait_for_products(self, page: Page) -> bool:
         """
@@ -474,17 +707,11 @@ class CompensarPlaywrightScraper:
         precio = Precio()
         full_text = soup.get_text()
         
-        # Buscar "Desde: $X.XXX"
-        desde_match = re.search(r'Desde[:\s]*(\$[\d.,]+)', full_text, re.IGNORECASE)
-        if desde_match:
-            precio.desde = desde_match.group(1)
-        else:
-            # Cualquier precio
-            price_match = re.search(r'\$[\d.,]+', full_text)
-            if price_match:
-                precio.desde = price_match.group()
-        
-        precio.valor_numerico = self._price_to_number(precio.desde)
+        # Buscar "Desde: $X.XXX"; si no hay, cualquier precio
+        prices = _find_prices(full_text)
+        if prices:
+            start, end, precio.es_desde = next((p for p in prices if p[2]), prices[0])
+            precio.desde = full_text[start:end]
         
         # === DETECTAR PROMOCIÓN ===
         promocion = bool(re.search(r'promoci[oó]n', full_text, re.IGNORECASE))
@@ -529,8 +756,82 @@ class CompensarPlaywrightScraper:
             fecha_limite_promocion=fecha_limite
         )
     
+    def _parse_cards(self, html: str, categoria_principal: str, subcategoria: str) -> List[Producto]:
+        """
+        Busca las tarjetas de producto en el HTML de una categoría y las parsea.
+        
+        🎓 CPU PURO:
+        No toca el navegador, por eso puede correr en otro proceso
+        (ver _parse_cards_worker).
+        """
+        productos = []
+        soup = BeautifulSoup(html, 'lxml')
+        
+        # === BUSCAR TARJETAS DE PRODUCTOS ===
+        cards = []
+        
+        # Selectores a probar (del más específico al más general)
+        card_selectors = [
+            '[class*="vtex"][class*="gallery"] > div',
+            '[class*="ProductCard"]',
+            '[class*="product-card"]',
+            '[class*="resultado"]',
+            'article',
+            '[class*="Card"]',
+        ]
+        
+        for selector in card_selectors:
+            cards = soup.select(selector)
+            if len(cards) > 0:
+                print(f"   ✅ Selector: {selector} ({len(cards)} elementos)")
+                break
+        
+        # Si no encontramos con selectores, buscar por precio
+        if not cards:
+            print("   🔍 Buscando por patrón de precios...")
+            # Buscar elementos que contengan precios
+            all_elements = soup.find_all(['div', 'article', 'li', 'section'])
+            for elem in all_elements:
+                text = elem.get_text()
+                if '$' in text and len(text) < 500:  # Evitar elementos muy grandes
+                    # Verificar que tenga nombre y precio
+                    if re.search(r'\$[\d.,]+', text):
+                        cards.append(elem)
+            
+            # Limpiar duplicados (elementos anidados)
+            unique_cards = []
+            for card in cards:
+                # Verificar que no sea hijo de otro card ya agregado
+                is_child = False
+                for uc in unique_cards:
+                    if card in uc.descendants:
+                        is_child = True
+                        break
+                if not is_child:
+                    unique_cards.append(card)
+            cards = unique_cards[:50]  # Limitar
+            
+            print(f"   📦 Encontrados {len(cards)} contenedores con precios")
+        
+        # === PARSEAR CADA TARJETA ===
+        for card in cards:
+            try:
+                producto = self._parse_product_card(
+                    str(card), 
+                    categoria_principal, 
+                    subcategoria
+                )
+                if producto:
+                    productos.append(producto)
+            except Exception as e:
+                continue
+        
+        return productos
+    
     async def scrape_category(self, subcategoria: str, categoria_principal: str = "General", 
-                               fetch_detail_prices: bool = True) -> List[Producto]:
+                               fetch_detail_prices: bool = True,
+                               context: Optional["BrowserContext"] = None,
+                               raise_errors: bool = False) -> List[Producto]:
         """
         Scrapea una subcategoría completa.
         
@@ -547,6 +848,9 @@ class CompensarPlaywrightScraper:
             subcategoria: Slug de la subcategoría
             categoria_principal: Nombre de la categoría principal
             fetch_detail_prices: Si True, visita cada producto para obtener precios por categoría
+            context: Contexto donde abrir la pestaña (default: el compartido)
+            raise_errors: Si True, relanza el error tras mostrarlo, para que
+                quien presta el contexto (BrowserPool) sepa que debe reciclarlo
         """
         productos = []
         url = f"{self.NAVIGATION_URL}/{subcategoria}"
@@ -554,9 +858,10 @@ class CompensarPlaywrightScraper:
         print(f"\n📂 Scrapeando: {subcategoria}")
         print(f"   URL: {url}")
         
+        page = None
         try:
             # Crear nueva página/pestaña
-            page = await self.browser.new_page()
+            page = await (context or self.context).new_page()
             
             # Navegar
             await page.goto(url, wait_until='networkidle')
@@ -569,66 +874,16 @@ class CompensarPlaywrightScraper:
             
             # Obtener HTML completo
             html = await page.content()
-            soup = BeautifulSoup(html, 'lxml')
-            
-            # === BUSCAR TARJETAS DE PRODUCTOS ===
-            cards = []
-            
-            # Selectores a probar (del más específico al más general)
-            card_selectors = [
-                '[class*="vtex"][class*="gallery"] > div',
-                '[class*="ProductCard"]',
-                '[class*="product-card"]',
-                '[class*="resultado"]',
-                'article',
-                '[class*="Card"]',
-            ]
             
-            for selector in card_selectors:
-                cards = soup.select(selector)
-                if len(cards) > 0:
-                    print(f"   ✅ Selector: {selector} ({len(cards)} elementos)")
-                    break
-            
-            # Si no encontramos con selectores, buscar por precio
-            if not cards:
-                print("   🔍 Buscando por patrón de precios...")
-                # Buscar elementos que contengan precios
-                all_elements = soup.find_all(['div', 'article', 'li', 'section'])
-                for elem in all_elements:
-                    text = elem.get_text()
-                    if '$' in text and len(text) < 500:  # Evitar elementos muy grandes
-                        # Verificar que tenga nombre y precio
-                        if re.search(r'\$[\d.,]+', text):
-                            cards.append(elem)
-                
-                # Limpiar duplicados (elementos anidados)
-                unique_cards = []
-                for card in cards:
-                    # Verificar que no sea hijo de otro card ya agregado
-                    is_child = False
-                    for uc in unique_cards:
-                        if card in uc.descendants:
-                            is_child = True
-                            break
-                    if not is_child:
-                        unique_cards.append(card)
-                cards = unique_cards[:50]  # Limitar
-                
-                print(f"   📦 Encontrados {len(cards)} contenedores con precios")
-            
-            # === PARSEAR CADA TARJETA ===
-            for card in cards:
-                try:
-                    producto = self._parse_product_card(
-                        str(card), 
-                        categoria_principal, 
-                        subcategoria
-                    )
-                    if producto:
-                        productos.append(producto)
-                except Exception as e:
-                    continue
+            # Parsear en otro proceso: BeautifulSoup es CPU puro y bloquearía
+            # el event loop (y con él las demás páginas abiertas)
+            if self._pool:
+                cards_data = await asyncio.get_running_loop().run_in_executor(
+                    self._pool, _parse_cards_worker, html, categoria_principal, subcategoria
+                )
+            else:
+                cards_data = _parse_cards_worker(html, categoria_principal, subcategoria)
+            productos = [Producto.from_dict(d) for d in cards_data]
             
             print(f"   📊 Productos extraídos: {len(productos)}")
             
@@ -666,42 +921,78 @@ class CompensarPlaywrightScraper:
                             print(f"❌ Error")
                             continue
             
-            # Cerrar pestaña
-            await page.close()
-            
         except Exception as e:
             print(f"   ❌ Error: {e}")
+            if raise_errors:
+                raise
+        finally:
+            # Cerrar la pestaña también si falló: el contexto compartido vive
+            # toda la corrida y cada pestaña abierta se quedaría ahí
+            if page is not None:
+                await page.close()
         
         return productos
     
     async def scrape_all(self, 
                          subcategorias: Optional[List[str]] = None,
                          categoria_principal: str = "General",
-                         fetch_detail_prices: bool = True) -> List[Producto]:
+                         fetch_detail_prices: bool = True,
+                         concurrency: int = 4,
+                         stream_dir: Optional[str] = None,
+                         keep_in_memory: bool = True) -> List[Producto]:
         """
         Scrapea todas las subcategorías.
         
+        🎓 CONCURRENCIA:
+        Cada subcategoría se abre en su propia pestaña del contexto
+        compartido (un solo navegador, sin recursos pesados). Un
+        Semaphore limita cuántas se cargan a la vez, así la espera de red y
+        de JS de una categoría se solapa con la de las demás.
+        
         Args:
             subcategorias: Lista de subcategorías a scrapear
             categoria_principal: Categoría principal
             fetch_detail_prices: Si True, visita cada producto para precios A/B/C
+            concurrency: Máximo de subcategorías scrapeando a la vez
+            stream_dir: Si se da, cada subcategoría terminada se escribe en
+                stream_dir/productos.jsonl y, por lotes, en stream_dir/compensar.db
+            keep_in_memory: Con stream_dir, False evita acumular en self.productos
+                (la memoria queda acotada a las subcategorías en curso)
         """
         if not self.browser:
             await self.start()
         
         subcategorias = subcategorias or self.SUBCATEGORIAS
+        sem = asyncio.Semaphore(max(1, concurrency))
         
-        for i, subcat in enumerate(subcategorias, 1):
-            print(f"\n[{i}/{len(subcategorias)}]", end="")
-            productos = await self.scrape_category(
-                subcat, 
-                categoria_principal,
-                fetch_detail_prices=fetch_detail_prices
+        async def _scrape_one(i: int, subcat: str) -> List[Producto]:
+            async with sem:
+                print(f"\n[{i}/{len(subcategorias)}]", end="")
+                productos = await self.scrape_category(
+                    subcat, 
+                    categoria_principal,
+                    fetch_detail_prices=fetch_detail_prices
+                )
+                # Pequeña pausa antes de liberar el cupo, para no sobrecargar
+                await asyncio.sleep(1)
+            if self._jsonl:
+                self._stream(productos)
+                if not keep_in_memory:
+                    productos = []
+            return productos
+        
+        if stream_dir:
+            self._open_stream(Path(stream_dir))
+        try:
+            # gather conserva el orden de entrada: los productos quedan agrupados
+            # por subcategoría igual que en el recorrido secuencial
+            resultados = await asyncio.gather(
+                *(_scrape_one(i, subcat) for i, subcat in enumerate(subcategorias, 1))
             )
+        finally:
+            self._close_stream()
+        for productos in resultados:
             self.productos.extend(productos)
-            
-            # Pequeña pausa para no sobrecargar
-            await asyncio.sleep(1)
         
         print(f"\n\n{'='*60}")
         print(f"📊 TOTAL PRODUCTOS SCRAPEADOS: {len(self.productos)}")
@@ -712,6 +1003,7 @@ class CompensarPlaywrightScraper:
     def save_to_json(self, filepath: str):
         """Guarda en JSON"""
         os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        normalize_prices(self.productos)
         
         data = [p.to_dict() for p in self.productos]
         with open(filepath, 'w', encoding='utf-8') as f:
@@ -722,56 +1014,14 @@ class CompensarPlaywrightScraper:
     def save_to_sqlite(self, filepath: str):
         """Guarda en base de datos SQLite"""
         os.makedirs(os.path.dirname(filepath) or '.', exist_ok=True)
+        normalize_prices(self.productos)
         
         conn = sqlite3.connect(filepath)
         cursor = conn.cursor()
         
-        # Crear tabla
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS productos (
-                id TEXT PRIMARY KEY,
-                nombre TEXT NOT NULL,
-                categoria_principal TEXT,
-                subcategoria TEXT,
-                precio_desde TEXT,
-                precio_categoria_a TEXT,
-                precio_categoria_b TEXT,
-                precio_categoria_c TEXT,
-                precio_no_afiliado TEXT,
-                valor_numerico REAL,
-                descripcion TEXT,
-                url TEXT,
-                imagen_url TEXT,
-                promocion INTEGER,
-                fecha_limite_promocion TEXT,
-                fecha_scraping TEXT
-            )
-        ''')
-        
-        # Insertar productos
-        for p in self.productos:
-            cursor.execute('''
-                INSERT OR REPLACE INTO productos VALUES (
-                    ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?
-                )
-            ''', (
-                p.id,
-                p.nombre,
-                p.categoria_principal,
-                p.subcategoria,
-                p.precio.desde,
-                p.precio.categoria_a,
-                p.precio.categoria_b,
-                p.precio.categoria_c,
-                p.precio.no_afiliado,
-                p.precio.valor_numerico,
-                p.descripcion,
-                p.url,
-                p.imagen_url,
-                1 if p.promocion else 0,
-                p.fecha_limite_promocion,
-                p.fecha_scraping
-            ))
+        # Crear tabla e insertar todos los productos en un solo executemany
+        cursor.execute(_SQLITE_SCHEMA)
+        cursor.executemany(_SQLITE_INSERT, [_sqlite_row(p) for p in self.productos])
         
         conn.commit()
         conn.close()
@@ -779,6 +1029,81 @@ class CompensarPlaywrightScraper:
         print(f"💾 Base de datos guardada en: {filepath}")
 
 
+class BrowserPool:
+    """
+    Un solo navegador para todo el scraping, con un pool de contextos.
+    
+    🎓 Lanzar Chromium cuesta segundos; abrir un contexto, milisegundos.
+    La cola de contextos además limita cuántas subcategorías corren a la
+    vez (tantas como contextos). Cada contexto se recicla (se cierra y se
+    crea uno nuevo) tras `max_pages` subcategorías, o si una falla, para
+    que la memoria no crezca sin límite.
+    """
+    
+    def __init__(self, scraper: CompensarPlaywrightScraper, size: int, max_pages: int):
+        self.scraper = scraper
+        self.size = size
+        self.max_pages = max_pages
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._pages = {}
+    
+    @classmethod
+    async def create(cls, headless: bool = True, size: int = 4,
+                     max_pages: int = 10, executable_path: Optional[str] = None) -> "BrowserPool":
+        """
+        Lanza el navegador y llena el pool con `size` contextos.
+        
+        Si el navegador no arranca (p. ej. Chromium nunca se descargó), se
+        libera lo que alcanzó a abrirse y el error se propaga.
+        """
+        scraper = CompensarPlaywrightScraper(headless=headless, executable_path=executable_path)
+        try:
+            await scraper.start()
+        except Exception:
+            await scraper.stop()
+            raise
+        pool = cls(scraper, size, max_pages)
+        for _ in range(size):
+            await pool._refill()
+        return pool
+    
+    async def _refill(self):
+        context = await self.scraper.new_context()
+        self._pages[context] = 0
+        self._queue.put_nowait(context)
+    
+    async def acquire(self):
+        """Espera a que haya un contexto libre."""
+        return await self._queue.get()
+    
+    async def release(self, context, failed: bool = False):
+        """Devuelve el contexto al pool, o lo recicla si ya se usó mucho."""
+        self._pages[context] += 1
+        if failed or self._pages[context] >= self.max_pages:
+            del self._pages[context]
+            try:
+                await context.close()
+            finally:
+                await self._refill()
+        else:
+            self._queue.put_nowait(context)
+    
+    async def close(self):
+        """Cierra el navegador (y con él todos los contextos)."""
+        await self.scraper.stop()
+
+
+def _parse_cards_worker(html: str, categoria_principal: str, subcategoria: str) -> List[dict]:
+    """
+    Parsea las tarjetas de una categoría dentro de un proceso del pool.
+    
+    Es una función de módulo (no un método) para que sea picklable, y
+    devuelve dicts planos que se reconstruyen como Producto en el proceso principal.
+    """
+    scraper = CompensarPlaywrightScraper()
+    return [p.to_dict() for p in scraper._parse_cards(html, categoria_principal, subcategoria)]
+
+
 # ============================================================================
 # EJECUCIÓN
 # ============================================================================
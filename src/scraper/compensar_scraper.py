@@ -4,11 +4,24 @@ Compensar Tienda Scraper
 Scrapes product and service data from https://www.tiendacompensar.com
 """
 
-import requests
-from bs4 import BeautifulSoup
-from typing import Dict, List, Optional
-import time
+import asyncio
+from aiolimiter import AsyncLimiter
+from collections import Counter
+import concurrent.futures
+import gzip
+import hashlib
+import httpx
+from lxml import etree
+import os
+import pandas as pd
+from pathlib import Path
+from selectolax.lexbor import LexborHTMLParser
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin
+import re
 import json
+import orjson
+import time
 from tqdm import tqdm
 from tenacity import retry, stop_after_attempt, wait_exponential
 import logging
@@ -17,6 +30,35 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Price with optional "Desde" prefix, e.g. "$10.300" or "Desde: $65.000"
+_PRICE_RE = re.compile(r'(desde[^$]{0,10})?\$\s*[\d\.\,]+', re.I)
+
+# Category slug in any navigation link, matched directly on the raw page bytes
+_CAT_RE = re.compile(rb'/navegacion/category/([a-z0-9\-]+)')
+
+
+def _class_selector(tags: str, keywords: Tuple[str, ...]) -> str:
+    """Build one CSS selector for `tags` whose class contains any keyword (case-insensitive)."""
+    return f":is({tags}):is({', '.join(f'[class*={k} i]' for k in keywords)})"
+
+
+def _find_by_class(elem, tags: Tuple[str, ...], class_re: re.Pattern):
+    """
+    First descendant of an lxml element with one of `tags` whose class matches `class_re`.
+    
+    Tag filtering happens inside lxml's iterator; the case-insensitive regex
+    avoids lowercasing every class attribute visited.
+    """
+    for node in elem.iter(*tags):
+        if class_re.search(node.get('class', '')):
+            return node
+    return None
+
+
+def _node_text(elem) -> str:
+    """Text of an lxml element, stripped per text node like selectolax's text(strip=True)."""
+    return ''.join(t.strip() for t in elem.itertext())
+
 
 class CompensarScraper:
     """
@@ -89,72 +131,333 @@ class CompensarScraper:
         "manualidades"
     ]
     
-    def __init__(self, delay: float = 1.0):
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'es-CO,es;q=0.9,en;q=0.8',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Connection': 'keep-alive',
+    }
+    
+    # Class keywords used to recognise each part of a product card
+    PRODUCT_CLASS_KEYWORDS = ('product', 'item', 'card', 'servicio', 'resultado')
+    NAME_CLASS_KEYWORDS = ('name', 'title', 'nombre', 'titulo')
+    DESC_CLASS_KEYWORDS = ('desc', 'detail', 'info')
+    
+    _PRODUCT_CLASS_RE = re.compile('|'.join(PRODUCT_CLASS_KEYWORDS), re.IGNORECASE)
+    _FALLBACK_CLASSES = frozenset({'product-card', 'item-card', 'service-card', 'resultado-item'})
+    
+    # Selectors built once; Lexbor matches each of them in a single C pass
+    _NAME_SELECTOR = _class_selector('h2, h3, h4, span, a', NAME_CLASS_KEYWORDS)
+    _DESC_SELECTOR = _class_selector('p, span', DESC_CLASS_KEYWORDS)
+    _HEADING_SELECTOR = 'h2, h3, h4'
+    
+    # Same lookups for lxml elements (iter_category_products)
+    _NAME_TAGS = ('h2', 'h3', 'h4', 'span', 'a')
+    _DESC_TAGS = ('p', 'span')
+    _NAME_CLASS_RE = re.compile('|'.join(NAME_CLASS_KEYWORDS), re.IGNORECASE)
+    _DESC_CLASS_RE = re.compile('|'.join(DESC_CLASS_KEYWORDS), re.IGNORECASE)
+    # Set on a matching element to count the product cards closed inside it
+    _CARD_COUNT_ATTR = 'data-scraper-cards'
+    
+    # Sockets kept open per client; sized for categories + their pagination in flight
+    POOL_SIZE = 32
+    
+    # Parses per category after which the winning name selector is frozen
+    SPECIALIZE_AFTER = 20
+    
+    # Product fields, stored column-wise in self._columns. Products travel
+    # through the extraction path as tuples (rows) in this order
+    COLUMNS = ('category', 'name', 'description', 'price', 'price_from',
+               'image_url', 'product_url', 'availability', 'rating', 'location')
+    _NAME_IDX = COLUMNS.index('name')
+    _URL_IDX = COLUMNS.index('product_url')
+    
+    # Response cache: {url: {etag, last_modified, fetched_at, body_path}} + gzipped bodies
+    CACHE_DIR = Path.home() / '.cache' / 'compensar'
+    
+    def __init__(self, delay: float = 1.0, concurrency: int = 8, cache_dir: Optional[str] = None,
+                 cache_expire_after: float = 3600):
         """
         Initialize the scraper.
         
         Args:
             delay: Time to wait between requests (in seconds) to be respectful
+            concurrency: Maximum number of categories fetched at the same time
+            cache_dir: Directory for the response cache (default: ~/.cache/compensar)
+            cache_expire_after: Seconds a cached page is served without revalidating
         """
         self.delay = delay
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'es-CO,es;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-        })
-        self.scraped_data: List[Dict] = []
+        self.concurrency = concurrency
+        self.cache_dir = Path(cache_dir) if cache_dir else self.CACHE_DIR
+        self.cache_expire_after = cache_expire_after
+        self._category_urls = {
+            c: urljoin(self.CATEGORY_URL + '/', c) for c in self.CATEGORIES_TO_SCRAPE
+        }
+        self._etags = self._load_etag_cache()
+        # Index changes are kept in memory and written once by _save_etag_cache
+        self._etags_dirty = False
+        # Transport-level retries cover connection failures without raising;
+        # tenacity on the fetch methods still handles 5xx responses
+        self.client = httpx.Client(
+            headers=self.HEADERS,
+            timeout=30,
+            transport=httpx.HTTPTransport(http2=True, retries=3, limits=self._pool_limits()),
+        )
+        self._aclient: Optional[httpx.AsyncClient] = None
+        self._limiter: Optional[AsyncLimiter] = None
+        # Lexbor parses outside the GIL, so pages parse in parallel with downloads
+        # (created on first async fetch, released by close())
+        self._parse_pool: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        # One pull parser reused for every streamed page (reset by close())
+        self._lxml_parser = etree.HTMLPullParser(
+            events=('end',), encoding='utf-8', remove_blank_text=True, huge_tree=False
+        )
+        # Per-category name selector hits, and extractors specialized from them
+        self._selector_stats: Dict[str, Counter] = {}
+        self._fast_extractors: Dict[str, Callable] = {}
+        # Product URLs already parsed, per category (duplicates across
+        # categories are dropped later, in category order)
+        self._seen_urls: Dict[str, set] = {}
+        self._columns: Dict[str, list] = {c: [] for c in self.COLUMNS}
+        # NDJSON sink, open only while scrape_all_categories(ndjson_path=...) runs
+        self._ndjson_path: Optional[Path] = None
+        self._out = None
+        self._keep_in_memory = True
+    
+    def _pool_limits(self) -> httpx.Limits:
+        """Connection pool limits shared by the sync and async clients."""
+        return httpx.Limits(max_connections=self.POOL_SIZE, max_keepalive_connections=self.POOL_SIZE)
+    
+    def _row_to_dict(self, row: tuple) -> Dict:
+        """Convert a product row into the public product dict."""
+        return dict(zip(self.COLUMNS, row))
+    
+    def _append_rows(self, rows: List[tuple]) -> None:
+        """Append product rows straight into the column store."""
+        for values, column in zip(zip(*rows), self._columns.values()):
+            column.extend(values)
+    
+    def iter_rows(self) -> Iterator[Dict]:
+        """
+        Iterate over the stored products as dicts.
+        
+        Each dict is built on the fly from the column store, so changing
+        it does not change the stored data.
+        
+        Yields:
+            Product dictionaries, in scrape order
+        """
+        for row in zip(*self._columns.values()):
+            yield self._row_to_dict(row)
+    
+    def _fetch_page(self, url: str) -> Optional[LexborHTMLParser]:
+        """
+        Fetch a page and return a parsed selectolax tree.
+        
+        Args:
+            url: URL to fetch
+            
+        Returns:
+            LexborHTMLParser tree or None if failed
+        """
+        return LexborHTMLParser(self._fetch_body(url))
     
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-    def _fetch_page(self, url: str) -> Optional[BeautifulSoup]:
+    def _fetch_body(self, url: str) -> bytes:
         """
-        Fetch a page and return BeautifulSoup object.
+        Fetch the raw body of a page, going through the response cache.
         
         Args:
             url: URL to fetch
             
         Returns:
-            BeautifulSoup object or None if failed
+            Decoded response body bytes
         """
+        cached = self._cached_body(url, max_age=self.cache_expire_after)
+        if cached is not None:
+            return cached
+        
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
-            return BeautifulSoup(response.content, 'lxml')
-        except requests.RequestException as e:
+            response = self.client.get(url, headers=self._conditional_headers(url))
+            return self._read_response(url, response)
+        except httpx.HTTPError as e:
+            stale = self._cached_body(url)
+            if stale is not None:
+                logger.warning(f"Error fetching {url}, serving stale cached copy: {e}")
+                return stale
             logger.error(f"Error fetching {url}: {e}")
             raise
     
-    def _extract_products_from_category(self, soup: BeautifulSoup, category: str) -> List[Dict]:
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
+    async def _afetch_page(self, url: str) -> Optional[LexborHTMLParser]:
         """
-        Extract product/service information from a category page.
+        Async version of _fetch_page using the shared httpx.AsyncClient.
         
         Args:
-            soup: BeautifulSoup object of the page
-            category: Category name
+            url: URL to fetch
             
         Returns:
-            List of product dictionaries
+            LexborHTMLParser tree or None if failed
         """
-        products = []
+        body = self._cached_body(url, max_age=self.cache_expire_after)
+        if body is None:
+            try:
+                if self._limiter:
+                    await self._limiter.acquire()
+                response = await self._aclient.get(url, headers=self._conditional_headers(url))
+                body = self._read_response(url, response)
+            except httpx.HTTPError as e:
+                body = self._cached_body(url)
+                if body is None:
+                    logger.error(f"Error fetching {url}: {e}")
+                    raise
+                logger.warning(f"Error fetching {url}, serving stale cached copy: {e}")
+        
+        if self._parse_pool is None:
+            self._parse_pool = concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count())
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._parse_pool, LexborHTMLParser, body)
+    
+    def _load_etag_cache(self) -> Dict[str, Dict]:
+        """Load the persisted cache index, or an empty one."""
+        try:
+            return json.loads((self.cache_dir / 'etags.json').read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_etag_cache(self) -> None:
+        """
+        Persist the cache index if it changed.
+        
+        Called once at the end of _agather and by close(), not per response.
+        The index goes to a temp file first and is swapped in with
+        os.replace, so a crash mid-write leaves the previous index intact.
+        """
+        if not self._etags_dirty:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self.cache_dir / 'etags.json'
+        tmp_path = path.with_suffix('.json.tmp')
+        tmp_path.write_bytes(orjson.dumps(self._etags))
+        os.replace(tmp_path, path)
+        self._etags_dirty = False
+    
+    def _cached_body(self, url: str, max_age: Optional[float] = None) -> Optional[bytes]:
+        """
+        Read a cached page body from disk.
         
-        # Try different selectors based on common e-commerce patterns
-        # These may need adjustment based on actual HTML structure
+        Args:
+            url: Page URL
+            max_age: Only return the body if it was fetched less than this many
+                seconds ago (None = any age, used as a stale-if-error fallback)
+            
+        Returns:
+            Raw HTML bytes, or None if there is no usable cached copy
+        """
+        entry = self._etags.get(url)
+        if not entry:
+            return None
+        if max_age is not None and time.time() - entry.get('fetched_at', 0) > max_age:
+            return None
+        try:
+            return gzip.decompress(Path(entry['body_path']).read_bytes())
+        except OSError:
+            return None
+    
+    def _conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Build If-None-Match / If-Modified-Since headers for a cached URL.
+        
+        Args:
+            url: URL about to be fetched
+            
+        Returns:
+            Extra request headers (empty if the URL has no usable cache entry)
+        """
+        entry = self._etags.get(url)
+        if not entry or not Path(entry['body_path']).exists():
+            return {}
+        
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+    
+    def _read_response(self, url: str, response: httpx.Response) -> bytes:
+        """
+        Return the page body, serving 304 Not Modified from the on-disk cache.
+        
+        Args:
+            url: Requested URL
+            response: Response to a (possibly conditional) GET
+            
+        Returns:
+            Raw HTML bytes
+        """
+        if response.status_code == 304:
+            logger.debug(f"Not modified, using cached body for {url}")
+            self._etags[url]['fetched_at'] = time.time()
+            self._etags_dirty = True
+            return gzip.decompress(Path(self._etags[url]['body_path']).read_bytes())
+        
+        response.raise_for_status()
         
-        # Look for product cards/items
-        product_containers = soup.find_all(['div', 'article'], class_=lambda x: x and any(
-            keyword in str(x).lower() for keyword in ['product', 'item', 'card', 'servicio', 'resultado']
-        ))
+        # Only plain 200 responses are cached
+        if response.status_code == 200:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            body_path = self.cache_dir / f"{hashlib.sha1(url.encode()).hexdigest()}.html.gz"
+            body_path.write_bytes(gzip.compress(response.content))
+            self._etags[url] = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': time.time(),
+                'body_path': str(body_path),
+            }
+            self._etags_dirty = True
+        
+        return response.content
+    
+    def _extract_products_from_category(self, tree: LexborHTMLParser, category: str) -> List[tuple]:
+        """
+        Extract product/service information from a category page.
+        
+        Args:
+            tree: Parsed selectolax tree of the page
+            category: Category name
+            
+        Returns:
+            List of product rows, in COLUMNS order
+        """
+        product_nodes = []
+        fallback_nodes = []
+        link_nodes = []
         
-        if not product_containers:
-            # Try generic approach
-            product_containers = soup.select('.product-card, .item-card, .service-card, .resultado-item')
+        # Single walk over the DOM, classifying every element as we go
+        for node in tree.root.traverse(include_text=False):
+            tag = node.tag
+            if tag == 'a':
+                href = node.attributes.get('href') or ''
+                if '/producto/' in href or '/servicio/' in href:
+                    link_nodes.append(node)
+            
+            classes = node.attributes.get('class')
+            if not classes:
+                continue
+            # Look for product cards/items
+            if tag in ('div', 'article') and self._PRODUCT_CLASS_RE.search(classes):
+                product_nodes.append(node)
+            # Generic card classes, only used if nothing above matched
+            elif not self._FALLBACK_CLASSES.isdisjoint(classes.split()):
+                fallback_nodes.append(node)
         
-        for container in product_containers:
+        products = []
+        for container in product_nodes or fallback_nodes:
             try:
                 product = self._parse_product_container(container, category)
-                if product and product.get('name'):
+                if product:
                     products.append(product)
             except Exception as e:
                 logger.warning(f"Error parsing product: {e}")
@@ -162,145 +465,344 @@ class CompensarScraper:
         
         # Also try to find products in a list/grid format
         if not products:
-            products = self._extract_products_alternative(soup, category)
+            for link in link_nodes:
+                product = self._parse_product_link(link, category)
+                if product and product[self._NAME_IDX]:
+                    products.append(product)
         
         return products
     
-    def _parse_product_container(self, container, category: str) -> Optional[Dict]:
+    def _parse_product_container(self, container, category: str) -> Optional[tuple]:
         """
         Parse a single product container.
         
+        The product URL is read first so products already seen (in this or
+        an overlapping category) are skipped before any text extraction.
+        Then the category's specialized extractor is used once one has been
+        built, otherwise the generic selector cascade. The URL is only
+        recorded as seen once a product was actually built from it.
+        
         Args:
-            container: BeautifulSoup element containing product info
+            container: selectolax node containing product info
             category: Category name
             
         Returns:
-            Product dictionary or None
-        """
-        product = {
-            'category': category,
-            'name': None,
-            'description': None,
-            'price': None,
-            'price_from': None,
-            'image_url': None,
-            'product_url': None,
-            'availability': None,
-            'rating': None,
-            'location': None
-        }
+            Product row or None
+        """
+        link = container.css_first('a[href]')
+        product_url = urljoin(self.BASE_URL, link.attributes['href']) if link else None
+        if product_url in self._seen(category):
+            return None
+        
+        extractor = self._fast_extractors.get(category, self._parse_product_container_generic)
+        return self._mark_seen(extractor(container, category, product_url))
+    
+    def _seen(self, category: str) -> set:
+        """Product URLs already parsed in `category` during this run."""
+        return self._seen_urls.setdefault(category, set())
+    
+    def _mark_seen(self, product: Optional[tuple]) -> Optional[tuple]:
+        """
+        Record the URL of a parsed product so later copies are skipped.
         
-        # Extract name
-        name_elem = container.find(['h2', 'h3', 'h4', 'span', 'a'], class_=lambda x: x and any(
-            keyword in str(x).lower() for keyword in ['name', 'title', 'nombre', 'titulo']
-        ))
-        if name_elem:
-            product['name'] = name_elem.get_text(strip=True)
-        else:
+        Args:
+            product: Product row, or None if parsing failed
+            
+        Returns:
+            The same product, unchanged
+        """
+        if product and product[self._NAME_IDX] and product[self._URL_IDX]:
+            self._seen(product[0]).add(product[self._URL_IDX])
+        return product
+    
+    def _parse_product_container_generic(self, container, category: str,
+                                         product_url: Optional[str]) -> Optional[tuple]:
+        """
+        Parse a product container trying every name selector in turn.
+        
+        Records which selector matched; after SPECIALIZE_AFTER parses in which
+        the same selector always won, a fast extractor that only tries that
+        selector is registered for the category.
+        
+        Args:
+            container: selectolax node containing product info
+            category: Category name
+            product_url: Absolute product URL, already resolved
+            
+        Returns:
+            Product row or None
+        """
+        name_selector = self._NAME_SELECTOR
+        name_elem = container.css_first(name_selector)
+        if not name_elem:
             # Try first heading
-            heading = container.find(['h2', 'h3', 'h4'])
-            if heading:
-                product['name'] = heading.get_text(strip=True)
-        
-        # Extract price (looking for patterns like "$10.300" or "Desde: $65.000")
-        price_elem = container.find(string=lambda x: x and '$' in str(x))
-        if price_elem:
-            price_text = str(price_elem).strip()
-            product['price'] = price_text
-            if 'desde' in price_text.lower():
-                product['price_from'] = True
-        
-        # Also look for price in specific elements
-        price_container = container.find(class_=lambda x: x and 'price' in str(x).lower())
-        if price_container and not product['price']:
-            product['price'] = price_container.get_text(strip=True)
+            name_selector = self._HEADING_SELECTOR
+            name_elem = container.css_first(name_selector)
+        if not name_elem:
+            return None
+        
+        stats = self._selector_stats.setdefault(category, Counter())
+        stats[name_selector] += 1
+        if len(stats) == 1 and stats[name_selector] >= self.SPECIALIZE_AFTER:
+            self._fast_extractors[category] = self._make_fast_extractor(name_selector)
+        
+        return self._parse_product_fields(container, category, name_elem, product_url)
+    
+    def _make_fast_extractor(self, name_selector: str) -> Callable:
+        """
+        Build an extractor that reads the name with a single known selector.
+        
+        Args:
+            name_selector: Selector that matched every container so far
+            
+        Returns:
+            Function with the same signature as _parse_product_container
+        """
+        def extract(container, category: str, product_url: Optional[str]) -> Optional[tuple]:
+            name_elem = container.css_first(name_selector)
+            if not name_elem:
+                # Page layout changed; fall back to the full cascade
+                return self._parse_product_container_generic(container, category, product_url)
+            return self._parse_product_fields(container, category, name_elem, product_url)
+        
+        return extract
+    
+    def _parse_product_fields(self, container, category: str, name_elem,
+                              product_url: Optional[str]) -> Optional[tuple]:
+        """
+        Extract every product field once the name element is known.
+        
+        Args:
+            container: selectolax node containing product info
+            category: Category name
+            name_elem: Node holding the product name
+            product_url: Absolute product URL, already resolved
+            
+        Returns:
+            Product row (COLUMNS order) or None
+        """
+        name = name_elem.text(strip=True)
+        if not name:
+            return None
+        description = price = price_from = image_url = None
+        
+        # Extract price in one regex pass over the container text
+        price_match = _PRICE_RE.search(container.text(separator=' '))
+        if price_match:
+            price = price_match.group(0)
+            price_from = bool(price_match.group(1))
         
         # Extract description
-        desc_elem = container.find(['p', 'span'], class_=lambda x: x and any(
-            keyword in str(x).lower() for keyword in ['desc', 'detail', 'info']
-        ))
+        desc_elem = container.css_first(self._DESC_SELECTOR)
         if desc_elem:
-            product['description'] = desc_elem.get_text(strip=True)
+            description = desc_elem.text(strip=True)
         
         # Extract image
-        img = container.find('img')
+        img = container.css_first('img')
         if img:
-            product['image_url'] = img.get('src') or img.get('data-src')
-            if product['image_url'] and not product['image_url'].startswith('http'):
-                product['image_url'] = f"{self.BASE_URL}{product['image_url']}"
+            image_url = img.attributes.get('src') or img.attributes.get('data-src')
+            if image_url:
+                image_url = urljoin(self.BASE_URL, image_url)
         
-        # Extract product URL
-        link = container.find('a', href=True)
-        if link:
-            href = link.get('href')
-            if href and not href.startswith('http'):
-                product['product_url'] = f"{self.BASE_URL}{href}"
-            else:
-                product['product_url'] = href
-        
-        return product if product['name'] else None
+        return (category, name, description, price, price_from, image_url, product_url,
+                None, None, None)
     
-    def _extract_products_alternative(self, soup: BeautifulSoup, category: str) -> List[Dict]:
+    def _parse_product_link(self, link, category: str) -> Optional[tuple]:
         """
-        Alternative extraction method for different page structures.
+        Build a product from a bare /producto/ or /servicio/ link.
+        Used for page structures without recognisable product cards.
         
         Args:
-            soup: BeautifulSoup object
+            link: selectolax <a> node
             category: Category name
             
         Returns:
-            List of products
+            Product row (name may be empty), or None if already seen
         """
-        products = []
+        href = link.attributes.get('href') or ''
+        name = link.text(strip=True)
+        product_url = urljoin(self.BASE_URL, href)
+        if name and product_url in self._seen(category):
+            return None
         
-        # Look for any links with prices nearby
-        all_links = soup.find_all('a', href=True)
-        
-        for link in all_links:
-            href = link.get('href', '')
-            if '/producto/' in href or '/servicio/' in href:
-                product = {
-                    'category': category,
-                    'name': link.get_text(strip=True),
-                    'product_url': href if href.startswith('http') else f"{self.BASE_URL}{href}",
-                    'description': None,
-                    'price': None,
-                    'image_url': None
-                }
-                
-                # Look for price nearby
-                parent = link.parent
-                if parent:
-                    price_text = parent.find(string=lambda x: x and '$' in str(x))
-                    if price_text:
-                        product['price'] = str(price_text).strip()
-                
-                if product['name']:
-                    products.append(product)
+        # Look for price nearby
+        price = None
+        parent = link.parent
+        if parent:
+            price_match = _PRICE_RE.search(parent.text(separator=' '))
+            if price_match:
+                price = price_match.group(0)
         
-        return products
+        return self._mark_seen((category, name, None, price, None, None, product_url,
+                                None, None, None))
     
     def scrape_category(self, category: str) -> List[Dict]:
         """
         Scrape all products from a specific category.
         
+        Synchronous wrapper for scripts: it starts its own event loop, so
+        code already running one (notebooks, async callers) must await
+        ascrape_category instead.
+        
+        Args:
+            category: Category slug (e.g., 'turismo', 'spa')
+            
+        Returns:
+            List of product dictionaries
+        """
+        return asyncio.run(self.ascrape_category(category))
+    
+    async def ascrape_category(self, category: str) -> List[Dict]:
+        """
+        Async version of scrape_category, usable from a running event loop.
+        
         Args:
             category: Category slug (e.g., 'turismo', 'spa')
             
         Returns:
             List of product dictionaries
         """
-        url = f"{self.CATEGORY_URL}/{category}"
+        return [self._row_to_dict(row) for row in await self._agather([category])]
+    
+    def iter_category_products(self, category: str) -> Iterator[Dict]:
+        """
+        Stream products from a category page while it downloads.
+        
+        The body is fed chunk by chunk into an lxml HTMLPullParser and each
+        product card is parsed as soon as its closing tag arrives, then
+        cleared, so memory is bounded by one card instead of the whole page.
+        Bypasses the response cache and does not follow pagination. The
+        parser is shared, so only one page can be streamed at a time.
+        
+        Args:
+            category: Category slug (e.g., 'turismo', 'spa')
+            
+        Yields:
+            Product dictionaries, in page order
+        """
+        url = self._category_urls.get(category) or urljoin(self.CATEGORY_URL + '/', category)
+        parser = self._lxml_parser
+        self._seen_urls[category] = set()
+        for _ in parser.read_events():
+            pass  # Leftovers from a stream whose consumer stopped early
+        
+        try:
+            with self.client.stream('GET', url) as response:
+                response.raise_for_status()
+                for chunk in response.iter_bytes(8192):
+                    parser.feed(chunk)
+                    for row in self._drain_product_events(parser, category):
+                        yield self._row_to_dict(row)
+        finally:
+            # Resets the parser for the next page, even on early exit
+            parser.close()
+        
+        for row in self._drain_product_events(parser, category):
+            yield self._row_to_dict(row)
+    
+    def _is_product_element(self, elem) -> bool:
+        """Check whether an lxml element looks like a product card."""
+        return elem.tag in ('div', 'article') and bool(self._PRODUCT_CLASS_RE.search(elem.get('class', '')))
+    
+    def _drain_product_events(self, parser: etree.HTMLPullParser, category: str) -> Iterator[tuple]:
+        """
+        Parse the product cards closed since the last call.
+        
+        The class match also catches page wrappers ("product-list",
+        "items-grid"). Each parsed card counts itself on its nearest matching
+        ancestor; an ancestor holding two or more cards is a wrapper, so the
+        cards under it are cleared right away and the wrapper itself is not
+        parsed. A single nested match (e.g. "card-body") is kept until its
+        card closes, whose duplicate product URL is then skipped.
+        
+        Args:
+            parser: Pull parser being fed the page
+            category: Category name
+            
+        Yields:
+            Product rows
+        """
+        for _, elem in parser.read_events():
+            if not self._is_product_element(elem):
+                continue
+            if int(elem.get(self._CARD_COUNT_ATTR, 0)) >= 2:
+                elem.clear()
+                continue
+            product = self._parse_product_from_lxml(elem, category)
+            owner = next((a for a in elem.iterancestors() if self._is_product_element(a)), None)
+            if owner is None:
+                elem.clear()
+            elif product:
+                count = int(owner.get(self._CARD_COUNT_ATTR, 0)) + 1
+                owner.set(self._CARD_COUNT_ATTR, str(count))
+                if count >= 2:
+                    elem.clear()
+            if product:
+                yield product
+    
+    def _parse_product_from_lxml(self, elem, category: str) -> Optional[tuple]:
+        """
+        lxml counterpart of _parse_product_container.
+        
+        Args:
+            elem: lxml element containing product info
+            category: Category name
+            
+        Returns:
+            Product row or None
+        """
+        link = elem.find('.//a[@href]')
+        product_url = urljoin(self.BASE_URL, link.get('href')) if link is not None else None
+        if product_url in self._seen(category):
+            return None
+        
+        name_elem = _find_by_class(elem, self._NAME_TAGS, self._NAME_CLASS_RE)
+        if name_elem is None:
+            name_elem = next(elem.iter('h2', 'h3', 'h4'), None)
+        name = _node_text(name_elem) if name_elem is not None else None
+        if not name:
+            return None
+        description = price = price_from = image_url = None
+        
+        price_match = _PRICE_RE.search(' '.join(elem.itertext()))
+        if price_match:
+            price = price_match.group(0)
+            price_from = bool(price_match.group(1))
+        
+        desc_elem = _find_by_class(elem, self._DESC_TAGS, self._DESC_CLASS_RE)
+        if desc_elem is not None:
+            description = _node_text(desc_elem)
+        
+        img = elem.find('.//img')
+        if img is not None:
+            src = img.get('src') or img.get('data-src')
+            if src:
+                image_url = urljoin(self.BASE_URL, src)
+        
+        return self._mark_seen((category, name, description, price, price_from, image_url,
+                                product_url, None, None, None))
+    
+    async def _ascrape_category(self, category: str) -> List[tuple]:
+        """
+        Scrape one category. Requires the client opened by _agather.
+        
+        Args:
+            category: Category slug (e.g., 'turismo', 'spa')
+            
+        Returns:
+            List of product rows
+        """
+        url = self._category_urls.get(category) or urljoin(self.CATEGORY_URL + '/', category)
         logger.info(f"Scraping category: {category} ({url})")
         
         try:
-            soup = self._fetch_page(url)
-            if soup:
-                products = self._extract_products_from_category(soup, category)
+            tree = await self._afetch_page(url)
+            if tree:
+                products = self._extract_products_from_category(tree, category)
                 logger.info(f"Found {len(products)} products in {category}")
                 
                 # Check for pagination
-                products.extend(self._handle_pagination(soup, category))
+                products.extend(await self._handle_pagination(tree, category))
                 
                 return products
         except Exception as e:
@@ -308,65 +810,159 @@ class CompensarScraper:
         
         return []
     
-    def _handle_pagination(self, soup: BeautifulSoup, category: str) -> List[Dict]:
+    async def _agather(self, categories: List[str]) -> List[tuple]:
+        """
+        Scrape several categories concurrently over one HTTP/2 connection pool.
+        
+        Network requests share one token bucket: on average one request per
+        `delay` seconds, with bursts of up to `concurrency` requests. Pages
+        served from the cache don't consume tokens.
+        
+        Results are consumed in `categories` order, whatever order the
+        fetches finish in, so a product listed in several categories always
+        stays with the first of them.
+        
+        Args:
+            categories: List of category slugs
+            
+        Returns:
+            List of all product rows, in the same order as categories
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        self._seen_urls = {}
+        seen_urls = set()
+        results = []
+        progress = tqdm(total=len(categories), desc="Scraping categories")
+        
+        async def bounded(category: str) -> List[tuple]:
+            async with semaphore:
+                products = await self._ascrape_category(category)
+            progress.update()
+            return products
+        
+        def keep_first(products: List[tuple]) -> List[tuple]:
+            kept = []
+            for product in products:
+                url = product[self._URL_IDX]
+                if url in seen_urls:
+                    continue
+                if url:
+                    seen_urls.add(url)
+                kept.append(product)
+            return kept
+        
+        async with httpx.AsyncClient(
+            headers=self.HEADERS,
+            timeout=30,
+            transport=httpx.AsyncHTTPTransport(http2=True, retries=3, limits=self._pool_limits()),
+        ) as client:
+            self._aclient = client
+            if self.delay > 0:
+                self._limiter = AsyncLimiter(self.concurrency, self.concurrency * self.delay)
+            tasks = [asyncio.ensure_future(bounded(c)) for c in categories]
+            try:
+                for task in tasks:
+                    products = keep_first(await task)
+                    if self._out:
+                        self._out.write(b''.join(orjson.dumps(self._row_to_dict(p)) + b'\n' for p in products))
+                        if not self._keep_in_memory:
+                            products = []
+                    results.append(products)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                self._save_etag_cache()
+                self._aclient = None
+                self._limiter = None
+                progress.close()
+        
+        return [product for products in results for product in products]
+    
+    async def _handle_pagination(self, tree: LexborHTMLParser, category: str) -> List[tuple]:
         """
         Handle pagination if present.
         
+        All page URLs are collected first and fetched concurrently, multiplexed
+        as HTTP/2 streams on the shared connection. The request rate is capped
+        by the shared limiter in _afetch_page.
+        
         Args:
-            soup: BeautifulSoup object of first page
+            tree: Parsed selectolax tree of first page
             category: Category name
             
         Returns:
-            List of additional products from other pages
+            List of additional product rows from other pages
         """
-        additional_products = []
-        
         # Look for pagination links
-        pagination = soup.find(class_=lambda x: x and 'pagination' in str(x).lower())
+        page_urls = []
+        pagination = tree.css_first('[class*="pagination" i]')
         if pagination:
-            page_links = pagination.find_all('a', href=True)
-            for page_link in page_links:
-                href = page_link.get('href')
-                if href and 'page=' in href:
-                    time.sleep(self.delay)
-                    try:
-                        page_soup = self._fetch_page(href if href.startswith('http') else f"{self.BASE_URL}{href}")
-                        if page_soup:
-                            additional_products.extend(
-                                self._extract_products_from_category(page_soup, category)
-                            )
-                    except Exception as e:
-                        logger.warning(f"Error fetching pagination: {e}")
-        
-        return additional_products
-    
-    def scrape_all_categories(self, categories: Optional[List[str]] = None) -> List[Dict]:
+            for page_link in pagination.css('a[href*="page="]'):
+                href = page_link.attributes.get('href')
+                if href:
+                    page_url = urljoin(self.BASE_URL, href)
+                    if page_url not in page_urls:
+                        page_urls.append(page_url)
+        
+        semaphore = asyncio.Semaphore(self.concurrency)
+        
+        async def fetch(page_url: str) -> List[tuple]:
+            async with semaphore:
+                try:
+                    page_tree = await self._afetch_page(page_url)
+                    if page_tree:
+                        return self._extract_products_from_category(page_tree, category)
+                except Exception as e:
+                    logger.warning(f"Error fetching pagination: {e}")
+            return []
+        
+        pages = await asyncio.gather(*[fetch(u) for u in page_urls])
+        return [product for products in pages for product in products]
+    
+    def scrape_all_categories(self, categories: Optional[List[str]] = None,
+                              ndjson_path: Optional[str] = None,
+                              keep_in_memory: bool = True) -> List[Dict]:
         """
         Scrape all specified categories.
         
         Args:
             categories: List of category slugs. If None, uses default list.
+            ndjson_path: If given, this NDJSON file is overwritten and each
+                category's products are written to it (one product per line)
+                as soon as the category finishes
+            keep_in_memory: With ndjson_path, set to False to drop products from
+                memory once written; the column store then stays empty
             
         Returns:
-            List of all scraped products
+            List of all scraped products (empty if keep_in_memory is False)
         """
         categories = categories or self.CATEGORIES_TO_SCRAPE
-        all_products = []
+        self._ndjson_path = Path(ndjson_path) if ndjson_path else None
+        self._keep_in_memory = keep_in_memory or not ndjson_path
         
-        for category in tqdm(categories, desc="Scraping categories"):
-            products = self.scrape_category(category)
-            all_products.extend(products)
-            time.sleep(self.delay)  # Be respectful to the server
+        if self._ndjson_path:
+            # Truncated per run: save_to_json converts the whole file
+            self._out = open(self._ndjson_path, 'wb')
+        self._columns = {c: [] for c in self.COLUMNS}
+        try:
+            rows = asyncio.run(self._agather(categories))
+        finally:
+            if self._out:
+                self._out.close()
+                self._out = None
         
-        self.scraped_data = all_products
-        logger.info(f"Total products scraped: {len(all_products)}")
+        self._append_rows(rows)
+        logger.info(f"Total products scraped: {len(rows)}")
         
-        return all_products
+        return list(self.iter_rows())
     
     def discover_all_categories(self) -> List[str]:
         """
         Discover all available categories from the website navigation.
         
+        Slugs are read with one regex sweep over the raw homepage bytes;
+        no HTML tree is built.
+        
         Returns:
             List of category slugs
         """
@@ -374,19 +970,8 @@ class CompensarScraper:
         categories = set()
         
         try:
-            soup = self._fetch_page(self.BASE_URL)
-            if soup:
-                # Find all navigation links
-                nav_links = soup.find_all('a', href=True)
-                for link in nav_links:
-                    href = link.get('href', '')
-                    if '/navegacion/category/' in href:
-                        # Extract category slug
-                        parts = href.split('/navegacion/category/')
-                        if len(parts) > 1:
-                            category = parts[1].split('/')[0].split('?')[0].split('#')[0]
-                            if category:
-                                categories.add(category)
+            body = self._fetch_body(self.BASE_URL)
+            categories = {slug.decode() for slug in _CAT_RE.findall(body)}
         except Exception as e:
             logger.error(f"Error discovering categories: {e}")
         
@@ -397,29 +982,65 @@ class CompensarScraper:
         """
         Save scraped data to JSON file.
         
+        If products were only written to NDJSON, the file is converted to a
+        JSON array line by line without loading it into memory.
+        
         Args:
             filepath: Path to save JSON file
         """
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(self.scraped_data, f, ensure_ascii=False, indent=2)
+        if self._ndjson_path and not self._keep_in_memory:
+            with open(self._ndjson_path, 'rb') as src, open(filepath, 'wb') as f:
+                f.write(b'[')
+                for i, line in enumerate(src):
+                    f.write((b',\n  ' if i else b'\n  ') + line.rstrip(b'\n'))
+                f.write(b'\n]')
+            logger.info(f"Data saved to {filepath}")
+            return
+        
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(list(self.iter_rows()), option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         logger.info(f"Data saved to {filepath}")
     
     def get_scraped_data(self) -> List[Dict]:
-        """Get all scraped data."""
-        return self.scraped_data
+        """Get a copy of all scraped data as a list of dicts."""
+        return list(self.iter_rows())
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Get scraped data as a DataFrame without going through row dicts.
+        
+        Returns:
+            DataFrame with one column per field; 'category' is categorical
+        """
+        df = pd.DataFrame(self._columns, columns=list(self.COLUMNS))
+        df['category'] = df['category'].astype('category')
+        return df
+    
+    def close(self) -> None:
+        """Save the cache index, then close the HTTP client and the parser thread pool."""
+        self._save_etag_cache()
+        self.client.close()
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
 
 
 if __name__ == "__main__":
     # Test the scraper
-    scraper = CompensarScraper(delay=1.5)
-    
-    # First, discover categories
-    categories = scraper.discover_all_categories()
-    print(f"Discovered categories: {categories}")
-    
-    # Scrape turismo as a test
-    products = scraper.scrape_category("turismo")
-    print(f"Found {len(products)} products in turismo")
+    with CompensarScraper(delay=1.5) as scraper:
+        # First, discover categories
+        categories = scraper.discover_all_categories()
+        print(f"Discovered categories: {categories}")
+        
+        # Scrape turismo as a test
+        products = scraper.scrape_category("turismo")
+        print(f"Found {len(products)} products in turismo")
     
     for product in products[:5]:
         print(f"  - {product['name']}: {product['price']}")
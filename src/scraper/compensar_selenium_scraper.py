@@ -10,15 +10,24 @@ Estructura de datos a extraer:
 - Precios: Categoría A, B, C, No afiliado
 """
 
-import subprocess
+import asyncio
+import atexit
+import shutil
+import sys
 import time
-import json
+import orjson
 import os
 import re
+import random
+import functools
+import multiprocessing
+import multiprocessing.util
 from typing import Dict, List, Optional
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from pathlib import Path
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+from lxml.cssselect import CSSSelector
 
 # Intentar importar selenium
 try:
@@ -28,14 +37,55 @@ try:
     from selenium.webdriver.common.by import By
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
-    from selenium.common.exceptions import TimeoutException, WebDriverException
+    from selenium.common.exceptions import (
+        StaleElementReferenceException, TimeoutException, WebDriverException
+    )
     SELENIUM_AVAILABLE = True
 except ImportError:
     SELENIUM_AVAILABLE = False
     print("⚠️ Selenium no instalado. Ejecuta: pip install selenium")
 
+# aiohttp es opcional: sin él solo queda el camino con Selenium
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+
+# Regex compiladas una sola vez (se usan por cada tarjeta)
+_RE_DESDE = re.compile(r'Desde[:\s]*(\$[\d.,]+)', re.IGNORECASE)
+_RE_PRICE = re.compile(r'\$[\d.,]+')
+_RE_PROMO = re.compile(r'promoci[oó]n', re.IGNORECASE)
+_RE_FECHA = re.compile(r'Hasta\s+\d+\s+\w+\.?', re.IGNORECASE)
+
+# Selectores del nombre dentro de una tarjeta (se consultan en una sola pasada)
+NAME_SELECTORS = ('h2', 'h3', 'h4', '.product-name', '.title', '[class*="name"]', '[class*="title"]')
 
-@dataclass
+# Plan B sin tarjetas: el div/article/li más cercano a cada texto con "$<dígito>".
+# Compilada una vez; lxml filtra los nodos de texto en C, sin regex por nodo
+_FALLBACK_XPATH = etree.XPath(
+    "//text()[contains(translate(., '0123456789', '0000000000'), '$0')]"
+    "/ancestor::*[self::div or self::article or self::li][1]"
+)
+
+# Selectores de tarjetas, en orden de preferencia: gana el primero que encuentre algo
+CARD_SELECTORS = (
+    '[class*="product-card"]',
+    '[class*="resultado"]',
+    '[class*="gallery"] > div',
+    '[class*="Card"]',
+    'article',
+)
+
+# CSSSelector traduce el CSS a XPath una sola vez, al importar el módulo
+_CARD_SELS = [(selector, CSSSelector(selector, translator='html')) for selector in CARD_SELECTORS]
+_NAME_SEL = CSSSelector(','.join(NAME_SELECTORS), translator='html')
+_A_SEL = CSSSelector('a[href]', translator='html')
+_IMG_SEL = CSSSelector('img', translator='html')
+
+
+@dataclass(slots=True)
 class Precio:
     """Estructura de precios por categoría de afiliación"""
     categoria_a: Optional[str] = None
@@ -45,9 +95,15 @@ class Precio:
     desde: Optional[str] = None  # Precio "Desde" mostrado en cards
 
 
-@dataclass
+@dataclass(slots=True)
 class Producto:
-    """Estructura de un producto/servicio de Compensar"""
+    """
+    Estructura de un producto/servicio de Compensar.
+    
+    🎓 slots=True quita el __dict__ de cada instancia, y las categorías
+    (unos 30 valores repetidos en miles de productos) se internan para
+    que todas las instancias compartan el mismo string.
+    """
     nombre: str
     categoria_principal: str  # Embarazadas, Niños, Adultos, etc.
     subcategoria: str  # Turismo, Música, etc.
@@ -58,9 +114,50 @@ class Producto:
     promocion: bool = False
     fecha_limite: Optional[str] = None  # "Hasta 31 dic."
     
+    def __post_init__(self):
+        self.categoria_principal = sys.intern(self.categoria_principal)
+        self.subcategoria = sys.intern(self.subcategoria)
+    
     def to_dict(self) -> dict:
-        """Convierte a diccionario para JSON"""
-        return asdict(self)
+        """Convierte a diccionario para JSON (a mano: asdict hace deep-copy recursivo)"""
+        precio = self.precio
+        return {
+            "nombre": self.nombre,
+            "categoria_principal": self.categoria_principal,
+            "subcategoria": self.subcategoria,
+            "precio": {
+                "categoria_a": precio.categoria_a,
+                "categoria_b": precio.categoria_b,
+                "categoria_c": precio.categoria_c,
+                "no_afiliado": precio.no_afiliado,
+                "desde": precio.desde,
+            },
+            "descripcion": self.descripcion,
+            "url": self.url,
+            "imagen_url": self.imagen_url,
+            "promocion": self.promocion,
+            "fecha_limite": self.fecha_limite,
+        }
+
+
+# Columnas del CSV (Producto aplanado: precio.x -> precio_x)
+_FLAT_FIELDS = (
+    "nombre", "categoria_principal", "subcategoria",
+    "precio_categoria_a", "precio_categoria_b", "precio_categoria_c",
+    "precio_no_afiliado", "precio_desde",
+    "descripcion", "url", "imagen_url", "promocion", "fecha_limite",
+)
+
+
+def _flat_row(p: Producto) -> tuple:
+    """Fila del CSV para un producto, en el orden de _FLAT_FIELDS"""
+    precio = p.precio
+    return (
+        p.nombre, p.categoria_principal, p.subcategoria,
+        precio.categoria_a, precio.categoria_b, precio.categoria_c,
+        precio.no_afiliado, precio.desde,
+        p.descripcion, p.url, p.imagen_url, p.promocion, p.fecha_limite,
+    )
 
 
 class CompensarSeleniumScraper:
@@ -71,6 +168,14 @@ class CompensarSeleniumScraper:
     
     BASE_URL = "https://www.tiendacompensar.com"
     NAVIGATION_URL = f"{BASE_URL}/navegacion/category"
+    # API de búsqueda de VTEX: devuelve el catálogo en JSON, sin renderizar nada
+    API_SEARCH_URL = f"{BASE_URL}/api/catalog_system/pub/products/search"
+    API_PAGE_SIZE = 50
+    # VTEX rechaza _from por encima de 2500: más allá no hay páginas que pedir
+    API_MAX_ITEMS = 2500
+    API_CONNECTIONS = 20
+    # Las descripciones de VTEX traen HTML largo; basta un resumen en el JSON/CSV
+    API_DESCRIPTION_MAX_CHARS = 200
     
     # Categorías principales del menú
     CATEGORIAS_PRINCIPALES = {
@@ -92,60 +197,73 @@ class CompensarSeleniumScraper:
         "sistemas", "spa", "turismo"
     ]
     
-    def __init__(self, headless: bool = False, timeout: int = 20):
+    # Cualquiera de estos indica que la grilla de productos ya cargó
+    PRODUCT_SELECTORS = (
+        ".product-card",
+        ".resultado-item",
+        "[class*='card']",
+        "[class*='product']",
+        ".vtex-search-result-3-x-galleryItem",
+    )
+    
+    # Con menos tarjetas que esto se asume que no hay lazy loading
+    SCROLL_MIN_CARDS = 12
+    
+    # Caché HTTP de Chrome en disco: el bundle de la SPA se descarga una sola vez
+    CHROME_CACHE_DIR = Path.home() / ".compensar_chrome_cache"
+    CHROME_CACHE_SIZE = 512 * 1024 * 1024
+    
+    def __init__(self, headless: bool = True, timeout: int = 20, cache_dir: Optional[str] = None):
         """
         Inicializa el scraper.
         
         Args:
             headless: Si True, ejecuta Chrome sin ventana visible
+                (COMPENSAR_SHOW_BROWSER=1 fuerza la ventana para depurar)
             timeout: Segundos a esperar por elementos
+            cache_dir: Directorio de la caché de Chrome (default: ~/.compensar_chrome_cache)
         """
         self.headless = headless
         self.timeout = timeout
+        self.cache_dir = Path(cache_dir) if cache_dir else self.CHROME_CACHE_DIR
         self.driver = None
         self.productos: List[Producto] = []
+        # URLs ya scrapeadas: muchos productos aparecen en varias subcategorías
+        self._seen_urls: set = set()
         
-    def _is_wsl(self) -> bool:
-        """Detecta si estamos en WSL"""
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _is_wsl() -> bool:
+        """Detecta si estamos en WSL (se calcula una sola vez)"""
         try:
             with open('/proc/version', 'r') as f:
                 return 'microsoft' in f.read().lower()
         except:
             return False
     
-    def _find_chrome_path(self) -> Optional[str]:
-        """Encuentra el path de Chrome en WSL/Windows"""
-        if self._is_wsl():
-            # Probar aliases y paths comunes de Windows
-            paths_to_try = [
-                # Alias comunes
-                "google-chrome",
-                "chrome",
-                # Paths de Windows a través de WSL
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _find_chrome_path() -> Optional[str]:
+        """
+        Encuentra el path de Chrome en WSL/Windows.
+        
+        🎓 Sin subprocesos: shutil.which recorre el PATH en Python y
+        os.path.isfile revisa los paths absolutos. El resultado se cachea.
+        """
+        if CompensarSeleniumScraper._is_wsl():
+            # Alias comunes
+            for alias in ("google-chrome", "chrome", "google"):
+                found = shutil.which(alias)
+                if found:
+                    return found
+            
+            # Paths de Windows a través de WSL
+            for path in (
                 "/mnt/c/Program Files/Google/Chrome/Application/chrome.exe",
                 "/mnt/c/Program Files (x86)/Google/Chrome/Application/chrome.exe",
-            ]
-            
-            for path in paths_to_try:
-                try:
-                    # Verificar si el comando existe
-                    result = subprocess.run(
-                        ["which", path] if not path.startswith("/mnt") else ["test", "-f", path],
-                        capture_output=True,
-                        text=True
-                    )
-                    if result.returncode == 0:
-                        return path
-                except:
-                    continue
-                    
-            # Intentar con los aliases
-            try:
-                result = subprocess.run(["which", "google"], capture_output=True, text=True)
-                if result.returncode == 0:
-                    return result.stdout.strip()
-            except:
-                pass
+            ):
+                if os.path.isfile(path):
+                    return path
                 
         return None
     
@@ -163,13 +281,28 @@ class CompensarSeleniumScraper:
         try:
             options = Options()
             
-            if self.headless:
+            if self.headless and not os.environ.get('COMPENSAR_SHOW_BROWSER'):
                 options.add_argument('--headless=new')
             
             # Opciones para mejor rendimiento y compatibilidad
             options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-gpu')
+            if not self._dev_shm_is_large():
+                options.add_argument('--disable-dev-shm-usage')
+            options.add_argument('--disable-gpu')  # Necesario en WSLg
+            
+            # 🎓 Caché persistente: JS/CSS de la SPA se reutilizan entre páginas y ejecuciones.
+            # Chrome la deja habilitada por defecto, así que no se toca vía CDP
+            # (la sesión webdriver.Remote de abajo tampoco expone execute_cdp_cmd)
+            options.add_argument(f'--disk-cache-dir={self.cache_dir}')
+            options.add_argument(f'--disk-cache-size={self.CHROME_CACHE_SIZE}')
+            
+            # 🎓 Solo necesitamos el HTML: no descargar imágenes ni CSS
+            options.add_argument('--blink-settings=imagesEnabled=false')
+            options.add_experimental_option("prefs", {
+                "profile.managed_default_content_settings.images": 2,
+                "profile.default_content_setting_values.notifications": 2,
+                "permissions.default.stylesheet": 2,
+            })
             options.add_argument('--window-size=1920,1080')
             options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
             
@@ -180,17 +313,20 @@ class CompensarSeleniumScraper:
                     print(f"🔍 Usando Chrome en: {chrome_path}")
                     options.binary_location = chrome_path
             
-            # Usar webdriver-manager para manejar el chromedriver
+            # 🎓 Un solo proceso chromedriver para todo el proceso Python:
+            # cada scraper abre una sesión nueva sobre él (sin re-arrancarlo)
             try:
-                from webdriver_manager.chrome import ChromeDriverManager
-                service = Service(ChromeDriverManager().install())
-                self.driver = webdriver.Chrome(service=service, options=options)
+                service = _get_service()
+                self.driver = webdriver.Remote(command_executor=service.service_url, options=options)
             except Exception as e:
-                print(f"⚠️ webdriver-manager falló: {e}")
-                # Intentar sin webdriver-manager
+                print(f"⚠️ chromedriver compartido falló: {e}")
+                # Intentar con el chromedriver que resuelva Selenium
                 self.driver = webdriver.Chrome(options=options)
             
             self.driver.set_page_load_timeout(self.timeout)
+            # ⚠️ La espera implícita DEBE quedar en 0: todas las esperas son
+            # explícitas (WebDriverWait) y mezclarlas multiplica los timeouts
+            self.driver.implicitly_wait(0)
             print("✅ Chrome iniciado correctamente")
             return True
             
@@ -202,6 +338,21 @@ class CompensarSeleniumScraper:
             print("   3. En WSL, puede ser necesario usar Chrome de Windows")
             return False
     
+    @staticmethod
+    def _dev_shm_is_large() -> bool:
+        """True si /dev/shm tiene espacio suficiente para Chrome (>= 1 GB)"""
+        try:
+            return shutil.disk_usage('/dev/shm').total >= 1024 ** 3
+        except OSError:
+            return False
+    
+    def _warm_up(self):
+        """Visita la home una vez para dejar en caché el bundle de la SPA"""
+        try:
+            self.driver.get(self.BASE_URL)
+        except WebDriverException as e:
+            print(f"⚠️ No se pudo precargar la home: {e}")
+    
     def stop_driver(self):
         """Cierra el driver"""
         if self.driver:
@@ -216,105 +367,84 @@ class CompensarSeleniumScraper:
         Returns:
             True si se encontraron productos
         """
+        # 🎓 Una sola espera explícita: termina apenas aparece CUALQUIER selector
+        conditions = [
+            EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+            for selector in self.PRODUCT_SELECTORS
+        ]
         try:
-            # Esperar a que desaparezca el loader o aparezcan productos
-            selectors = [
-                ".product-card",
-                ".resultado-item", 
-                "[class*='card']",
-                "[class*='product']",
-                ".vtex-search-result-3-x-galleryItem"
-            ]
-            
-            for selector in selectors:
-                try:
-                    WebDriverWait(self.driver, self.timeout).until(
-                        EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                    )
-                    return True
-                except TimeoutException:
-                    continue
-            
-            # Esperar un poco más por si hay animaciones
-            time.sleep(3)
+            WebDriverWait(
+                self.driver, self.timeout,
+                ignored_exceptions=(StaleElementReferenceException,)
+            ).until(EC.any_of(*conditions))
             return True
-            
-        except Exception as e:
+        except TimeoutException as e:
             print(f"⚠️ Timeout esperando productos: {e}")
             return False
     
     def _extract_price(self, text: str) -> str:
         """Extrae y limpia el precio de un texto"""
         # Buscar patrón de precio colombiano: $10.300 o $1.234.567
-        match = re.search(r'\$[\d.,]+', text)
+        match = _RE_PRICE.search(text)
         if match:
             return match.group()
         return text.strip()
     
-    def _parse_product_card(self, card_html: str, categoria_principal: str, subcategoria: str) -> Optional[Producto]:
+    def _parse_product_card(self, card, categoria_principal: str, subcategoria: str) -> Optional[Producto]:
         """
         Parsea una tarjeta de producto y extrae la información.
         
         Args:
-            card_html: HTML de la tarjeta
+            card: Elemento lxml de la tarjeta (ya parseado, sin re-serializar)
             categoria_principal: Categoría principal (Adultos, Niños, etc.)
             subcategoria: Subcategoría (Turismo, Música, etc.)
             
         Returns:
             Objeto Producto o None
         """
-        soup = BeautifulSoup(card_html, 'lxml')
-        
         # Extraer nombre
+        # 🎓 Un solo selector agrupado: el árbol se recorre una vez y el
+        # primer elemento (en orden del documento) con texto es el nombre
         nombre = None
-        for selector in ['h2', 'h3', 'h4', '.product-name', '.title', '[class*="name"]', '[class*="title"]']:
-            elem = soup.select_one(selector)
-            if elem:
-                nombre = elem.get_text(strip=True)
-                if nombre:
-                    break
+        for elem in _NAME_SEL(card):
+            nombre = elem.text_content().strip()
+            if nombre:
+                break
         
         if not nombre:
             return None
         
         # Extraer precio "Desde:"
         precio = Precio()
-        price_text = soup.get_text()
+        price_text = card.text_content()
         
         # Buscar "Desde: $X.XXX"
-        desde_match = re.search(r'Desde[:\s]*(\$[\d.,]+)', price_text, re.IGNORECASE)
+        desde_match = _RE_DESDE.search(price_text)
         if desde_match:
             precio.desde = desde_match.group(1)
         else:
             # Buscar cualquier precio
-            price_match = re.search(r'\$[\d.,]+', price_text)
+            price_match = _RE_PRICE.search(price_text)
             if price_match:
                 precio.desde = price_match.group()
         
         # Verificar si es promoción
-        promocion = bool(soup.find(string=re.compile(r'promoci[oó]n', re.IGNORECASE)))
+        promocion = bool(_RE_PROMO.search(price_text))
         
         # Extraer fecha límite
         fecha_limite = None
-        fecha_match = re.search(r'Hasta\s+\d+\s+\w+\.?', price_text, re.IGNORECASE)
+        fecha_match = _RE_FECHA.search(price_text)
         if fecha_match:
             fecha_limite = fecha_match.group()
         
         # Extraer URL
-        url = None
-        link = soup.find('a', href=True)
-        if link:
-            href = link.get('href', '')
-            if href.startswith('/'):
-                url = f"{self.BASE_URL}{href}"
-            elif href.startswith('http'):
-                url = href
+        url = self._card_url(card)
         
         # Extraer imagen
         imagen_url = None
-        img = soup.find('img')
-        if img:
-            imagen_url = img.get('src') or img.get('data-src')
+        imgs = _IMG_SEL(card)[:1]
+        if imgs:
+            imagen_url = imgs[0].get('src') or imgs[0].get('data-src')
             if imagen_url and imagen_url.startswith('/'):
                 imagen_url = f"{self.BASE_URL}{imagen_url}"
         
@@ -329,6 +459,36 @@ class CompensarSeleniumScraper:
             fecha_limite=fecha_limite
         )
     
+    def _card_url(self, card) -> Optional[str]:
+        """URL absoluta del primer enlace de la tarjeta (o None)"""
+        links = _A_SEL(card)[:1]
+        if links:
+            href = links[0].get('href', '')
+            if href.startswith('/'):
+                return f"{self.BASE_URL}{href}"
+            if href.startswith('http'):
+                return href
+        return None
+    
+    def _safe_parse(self, card, categoria_principal: str, subcategoria: str) -> Optional[Producto]:
+        """
+        Parsea una tarjeta sin dejar escapar excepciones.
+        
+        Returns:
+            Producto, o None si ya se vio en otra subcategoría o no se pudo parsear
+        """
+        card_url = self._card_url(card)
+        if card_url and card_url in self._seen_urls:
+            return None
+        try:
+            producto = self._parse_product_card(card, categoria_principal, subcategoria)
+        except Exception as e:
+            print(f"   ⚠️ Error parseando tarjeta: {e}")
+            return None
+        if producto and producto.url:
+            self._seen_urls.add(producto.url)
+        return producto
+    
     def scrape_category_page(self, url: str, categoria_principal: str, subcategoria: str) -> List[Producto]:
         """
         Scrapea una página de categoría.
@@ -350,92 +510,263 @@ class CompensarSeleniumScraper:
             self.driver.get(url)
             self._wait_for_products()
             
-            # Obtener el HTML renderizado
-            html = self.driver.page_source
-            soup = BeautifulSoup(html, 'lxml')
-            
-            # Buscar tarjetas de productos con varios selectores
-            cards = []
-            card_selectors = [
-                '[class*="product-card"]',
-                '[class*="resultado"]',
-                '[class*="gallery"] > div',
-                '[class*="Card"]',
-                'article',
-            ]
-            
-            for selector in card_selectors:
-                cards = soup.select(selector)
-                if cards:
-                    print(f"   ✅ Encontradas {len(cards)} tarjetas con selector: {selector}")
-                    break
+            # Obtener el HTML renderizado y parsearlo UNA vez (snapshot):
+            # todos los selectores se consultan sobre este árbol lxml
+            tree = lxml.html.fromstring(self.driver.page_source)
+            cards = self._find_cards(tree)
             
-            if not cards:
-                # Método alternativo: buscar por estructura de precio
-                print("   ⚠️ Buscando por estructura de precios...")
-                price_containers = soup.find_all(string=re.compile(r'\$[\d.,]+'))
-                for price in price_containers:
-                    parent = price.find_parent(['div', 'article', 'li'])
-                    if parent and parent not in cards:
-                        cards.append(parent)
-                print(f"   📦 Encontrados {len(cards)} contenedores con precios")
+            # Scroll para cargar más (lazy loading), solo si la grilla parece
+            # tener más páginas; si cargó contenido nuevo, tomar otro snapshot
+            if len(cards) >= self.SCROLL_MIN_CARDS and self._scroll_page():
+                tree = lxml.html.fromstring(self.driver.page_source)
+                cards = self._find_cards(tree)
             
-            # Parsear cada tarjeta
-            for card in cards:
-                try:
-                    producto = self._parse_product_card(str(card), categoria_principal, subcategoria)
-                    if producto:
-                        productos.append(producto)
-                except Exception as e:
-                    print(f"   ⚠️ Error parseando tarjeta: {e}")
+            # Parsear todas las tarjetas de una vez (None = repetida o inválida)
+            productos = [
+                p for p in (self._safe_parse(card, categoria_principal, subcategoria) for card in cards)
+                if p is not None
+            ]
             
             print(f"   📊 Productos extraídos: {len(productos)}")
             
-            # Scroll para cargar más (lazy loading)
-            self._scroll_page()
-            
         except Exception as e:
             print(f"   ❌ Error en {subcategoria}: {e}")
         
         return productos
     
-    def _scroll_page(self):
-        """Hace scroll para cargar contenido lazy-loaded"""
-        try:
-            # Scroll gradual
-            for i in range(3):
-                self.driver.execute_script(f"window.scrollTo(0, {(i+1) * 800});")
-                time.sleep(0.5)
+    def _find_cards(self, tree) -> list:
+        """
+        Busca las tarjetas de productos en el snapshot de la página.
+        
+        Args:
+            tree: Árbol lxml de la página renderizada
             
-            # Volver arriba
-            self.driver.execute_script("window.scrollTo(0, 0);")
-        except:
-            pass
+        Returns:
+            Lista de elementos lxml (tarjetas)
+        """
+        for selector, compiled in _CARD_SELS:
+            cards = compiled(tree)
+            if cards:
+                print(f"   ✅ Encontradas {len(cards)} tarjetas con selector: {selector}")
+                return cards
+        
+        # Método alternativo: buscar por estructura de precio
+        print("   ⚠️ Buscando por estructura de precios...")
+        cards = _FALLBACK_XPATH(tree)
+        print(f"   📦 Encontrados {len(cards)} contenedores con precios")
+        return cards
+    
+    def _scroll_page(self, max_rounds: int = 10) -> bool:
+        """
+        Hace scroll hasta el final mientras la página siga creciendo (lazy loading).
+        
+        🎓 En vez de pasos fijos con sleep, se espera (máx. 0.5 s) a que
+        cambie scrollHeight; si no cambia dos veces seguidas, no hay más.
+        
+        Returns:
+            True si se cargó contenido nuevo
+        """
+        get_height = "return document.body.scrollHeight"
+        try:
+            start = height = self.driver.execute_script(get_height)
+            unchanged = 0
+            for _ in range(max_rounds):
+                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                
+                def grew(driver, previous=height):
+                    new_height = driver.execute_script(get_height)
+                    return new_height if new_height > previous else False
+                
+                try:
+                    height = WebDriverWait(self.driver, 0.5, poll_frequency=0.1).until(grew)
+                    unchanged = 0
+                except TimeoutException:
+                    unchanged += 1
+                    if unchanged >= 2:
+                        break
+            return height > start
+        except WebDriverException:
+            return False
     
-    def scrape_all(self, subcategorias: Optional[List[str]] = None, categoria_principal: str = "General") -> List[Producto]:
+    def scrape_all(self, subcategorias: Optional[List[str]] = None, categoria_principal: str = "General",
+                   n_workers: int = 4) -> List[Producto]:
         """
         Scrapea todas las subcategorías.
         
+        🎓 Cada subcategoría es independiente, así que se reparten entre
+        `n_workers` procesos, cada uno con su propio Chrome (WebDriver no es
+        thread-safe, por eso procesos y no threads).
+        
         Args:
             subcategorias: Lista de subcategorías a scrapear (None = todas)
             categoria_principal: Categoría principal para asignar
+            n_workers: Procesos en paralelo (1 = secuencial con self.driver)
             
         Returns:
             Lista de todos los productos
         """
-        if not self.driver:
-            if not self.start_driver():
-                return []
-        
         subcategorias = subcategorias or self.SUBCATEGORIAS
         
-        for subcat in subcategorias:
-            url = f"{self.NAVIGATION_URL}/{subcat}"
-            productos = self.scrape_category_page(url, categoria_principal, subcat)
-            self.productos.extend(productos)
+        if n_workers <= 1:
+            if not self.driver:
+                if not self.start_driver():
+                    return []
+            self._warm_up()
+            for subcat in subcategorias:
+                url = f"{self.NAVIGATION_URL}/{subcat}"
+                self.productos.extend(self.scrape_category_page(url, categoria_principal, subcat))
+            return self.productos
+        
+        pool = multiprocessing.Pool(
+            processes=min(n_workers, len(subcategorias)),
+            initializer=_init_worker,
+            initargs=(self.headless, self.timeout)
+        )
+        try:
+            scrape = functools.partial(_scrape_one, categoria_principal=categoria_principal)
+            for productos in pool.imap_unordered(scrape, subcategorias):
+                # Cada worker deduplica lo suyo; aquí se quitan los repetidos entre workers
+                for producto in productos:
+                    if producto.url and producto.url in self._seen_urls:
+                        continue
+                    if producto.url:
+                        self._seen_urls.add(producto.url)
+                    self.productos.append(producto)
+        finally:
+            # close + join (no terminate) para que cada worker cierre su Chrome
+            pool.close()
+            pool.join()
+        
+        return self.productos
+    
+    async def scrape_category_api(self, session: "aiohttp.ClientSession", subcat: str,
+                                  categoria_principal: str) -> Optional[List[Producto]]:
+        """
+        Obtiene los productos de una subcategoría desde la API de VTEX.
+        
+        🎓 El sitio es una SPA sobre VTEX: el mismo JSON que pinta el
+        navegador se puede pedir directo, sin Chrome ni parseo de HTML.
+        La API pagina con _from/_to: se piden páginas de API_PAGE_SIZE
+        hasta que llega una incompleta.
+        
+        Returns:
+            Lista de productos, o None si la API no sirvió (error HTTP,
+            respuesta no-JSON o vacía en alguna página) y hay que ir por Selenium
+        """
+        url = f"{self.API_SEARCH_URL}/{subcat}"
+        productos = []
+        for from_ in range(0, self.API_MAX_ITEMS, self.API_PAGE_SIZE):
+            params = {"_from": from_, "_to": from_ + self.API_PAGE_SIZE - 1}
+            try:
+                async with session.get(url, params=params) as resp:
+                    # VTEX responde 206 (Partial Content) cuando pagina
+                    if resp.status >= 300:
+                        print(f"   ⚠️ API {subcat}: HTTP {resp.status}")
+                        return None
+                    data = await resp.json(content_type=None, loads=orjson.loads)
+            except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError) as e:
+                print(f"   ⚠️ API {subcat}: {e}")
+                return None
+            
+            if not isinstance(data, list):
+                return None
+            for item in data:
+                producto = self._parse_api_product(item, categoria_principal, subcat)
+                if producto:
+                    productos.append(producto)
+            if len(data) < self.API_PAGE_SIZE:
+                break
+        return productos or None
+    
+    def _parse_api_product(self, item: Dict, categoria_principal: str, subcat: str) -> Optional[Producto]:
+        """Convierte un producto del JSON de VTEX en Producto"""
+        nombre = item.get("productName")
+        if not nombre:
+            return None
+        
+        url = item.get("link")
+        if not url and item.get("linkText"):
+            url = f"{self.BASE_URL}/{item['linkText']}/p"
+        
+        precio = Precio()
+        imagen_url = None
+        promocion = False
+        skus = item.get("items") or []
+        if skus:
+            sku = skus[0]
+            images = sku.get("images") or []
+            if images:
+                imagen_url = images[0].get("imageUrl")
+            sellers = sku.get("sellers") or []
+            if sellers:
+                offer = sellers[0].get("commertialOffer") or {}
+                price = offer.get("Price")
+                if price:
+                    precio.desde = f"${float(price):,.0f}".replace(',', '.')
+                list_price = offer.get("ListPrice")
+                promocion = bool(price and list_price and price < list_price)
+        
+        return Producto(
+            nombre=nombre.strip(),
+            categoria_principal=categoria_principal,
+            subcategoria=subcat,
+            precio=precio,
+            descripcion=(item.get("description") or "")[:self.API_DESCRIPTION_MAX_CHARS] or None,
+            url=url,
+            imagen_url=imagen_url,
+            promocion=promocion,
+        )
+    
+    async def _scrape_all_api(self, subcategorias: List[str],
+                              categoria_principal: str) -> Dict[str, Optional[List[Producto]]]:
+        """Pide todas las subcategorías a la API en paralelo (una sesión compartida)"""
+        connector = aiohttp.TCPConnector(limit=self.API_CONNECTIONS)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            results = await asyncio.gather(*(
+                self.scrape_category_api(session, subcat, categoria_principal)
+                for subcat in subcategorias
+            ))
+        return dict(zip(subcategorias, results))
+    
+    def scrape_all_api(self, subcategorias: Optional[List[str]] = None, categoria_principal: str = "General",
+                       use_selenium_fallback: bool = True, n_workers: int = 4) -> List[Producto]:
+        """
+        Scrapea las subcategorías por la API y deja Selenium solo para las que fallen.
+        
+        Args:
+            subcategorias: Lista de subcategorías a scrapear (None = todas)
+            categoria_principal: Categoría principal para asignar
+            use_selenium_fallback: Si True, las subcategorías sin respuesta
+                útil de la API se scrapean con el navegador
+            n_workers: Procesos de Selenium para el fallback
             
-            # Pausa entre requests para no sobrecargar
-            time.sleep(1)
+        Returns:
+            Lista de todos los productos
+        """
+        subcategorias = subcategorias or self.SUBCATEGORIAS
+        
+        if not AIOHTTP_AVAILABLE:
+            print("⚠️ aiohttp no instalado (pip install aiohttp); usando Selenium")
+            pendientes = list(subcategorias)
+        else:
+            results = asyncio.run(self._scrape_all_api(subcategorias, categoria_principal))
+            pendientes = []
+            for subcat, productos in results.items():
+                if productos is None:
+                    pendientes.append(subcat)
+                    continue
+                print(f"   ✅ API {subcat}: {len(productos)} productos")
+                for producto in productos:
+                    if producto.url and producto.url in self._seen_urls:
+                        continue
+                    if producto.url:
+                        self._seen_urls.add(producto.url)
+                    self.productos.append(producto)
+        
+        if pendientes and use_selenium_fallback:
+            print(f"\n🌐 {len(pendientes)} subcategorías sin API, usando Selenium...")
+            self.scrape_all(pendientes, categoria_principal, n_workers=n_workers)
         
         return self.productos
     
@@ -443,12 +774,11 @@ class CompensarSeleniumScraper:
         """Guarda los productos en JSON"""
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         
-        data = [p.to_dict() for p in self.productos]
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # orjson serializa en C y escribe bytes UTF-8 directamente
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps([p.to_dict() for p in self.productos], option=orjson.OPT_INDENT_2))
         
-        print(f"\n💾 Guardados {len(data)} productos en: {filepath}")
+        print(f"\n💾 Guardados {len(self.productos)} productos en: {filepath}")
     
     def save_to_csv(self, filepath: str):
         """Guarda los productos en CSV"""
@@ -458,33 +788,84 @@ class CompensarSeleniumScraper:
         
         with open(filepath, 'w', encoding='utf-8', newline='') as f:
             if self.productos:
-                # Obtener todas las keys
-                sample = self.productos[0].to_dict()
-                fieldnames = []
-                for key, value in sample.items():
-                    if isinstance(value, dict):
-                        for subkey in value.keys():
-                            fieldnames.append(f"{key}_{subkey}")
-                    else:
-                        fieldnames.append(key)
-                
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                for producto in self.productos:
-                    row = {}
-                    data = producto.to_dict()
-                    for key, value in data.items():
-                        if isinstance(value, dict):
-                            for subkey, subvalue in value.items():
-                                row[f"{key}_{subkey}"] = subvalue
-                        else:
-                            row[key] = value
-                    writer.writerow(row)
+                # La forma del dataclass es fija: columnas y aplanado se definen una vez
+                writer = csv.writer(f)
+                writer.writerow(_FLAT_FIELDS)
+                writer.writerows(_flat_row(p) for p in self.productos)
         
         print(f"💾 Guardados {len(self.productos)} productos en: {filepath}")
 
 
+# ============================================
+# SERVICIO CHROMEDRIVER (compartido)
+# ============================================
+
+# chromedriver arrancado una vez por proceso; se detiene al salir (atexit)
+_SERVICE: Optional["Service"] = None
+
+# Path del chromedriver instalado, para no consultar webdriver-manager cada vez
+_DRIVER_PATH_FILE = CompensarSeleniumScraper.CHROME_CACHE_DIR / "chromedriver_path.txt"
+
+
+def _chromedriver_path() -> str:
+    """Path del chromedriver: el guardado en disco o el que instale webdriver-manager"""
+    try:
+        cached = _DRIVER_PATH_FILE.read_text().strip()
+        if os.path.isfile(cached):
+            return cached
+    except OSError:
+        pass
+    
+    from webdriver_manager.chrome import ChromeDriverManager
+    path = ChromeDriverManager().install()
+    _DRIVER_PATH_FILE.parent.mkdir(parents=True, exist_ok=True)
+    _DRIVER_PATH_FILE.write_text(path)
+    return path
+
+
+def _get_service() -> "Service":
+    """Devuelve el chromedriver compartido, arrancándolo la primera vez"""
+    global _SERVICE
+    if _SERVICE is None:
+        service = Service(_chromedriver_path())
+        service.start()
+        atexit.register(service.stop)
+        _SERVICE = service
+    return _SERVICE
+
+
+# ============================================
+# WORKERS (multiprocessing)
+# ============================================
+
+# Scraper del proceso worker; su Chrome se reutiliza para todas sus subcategorías
+_worker_scraper: Optional[CompensarSeleniumScraper] = None
+
+# Pausa aleatoria máxima por página, para no llegar al sitio en ráfagas
+WORKER_JITTER = 1.0
+
+
+def _init_worker(headless: bool, timeout: int):
+    """Inicializa un worker del Pool: abre un Chrome propio una sola vez."""
+    global _worker_scraper
+    # Cada worker con su propia caché: Chrome no comparte un directorio entre procesos
+    cache_dir = CompensarSeleniumScraper.CHROME_CACHE_DIR / multiprocessing.current_process().name
+    _worker_scraper = CompensarSeleniumScraper(headless=headless, timeout=timeout, cache_dir=str(cache_dir))
+    if _worker_scraper.start_driver():
+        _worker_scraper._warm_up()
+        # Se ejecuta cuando el worker termina normalmente (pool.close + join)
+        multiprocessing.util.Finalize(None, _worker_scraper.stop_driver, exitpriority=10)
+
+
+def _scrape_one(subcat: str, categoria_principal: str) -> List[Producto]:
+    """Scrapea una subcategoría con el Chrome del worker (función top-level para poder picklearla)."""
+    if _worker_scraper is None or _worker_scraper.driver is None:
+        return []
+    time.sleep(random.uniform(0, WORKER_JITTER))
+    url = f"{CompensarSeleniumScraper.NAVIGATION_URL}/{subcat}"
+    return _worker_scraper.scrape_category_page(url, categoria_principal, subcat)
+
+
 def demo_scraping():
     """
     Demo del scraper - muestra cómo extraer datos paso a paso
@@ -497,11 +878,11 @@ def demo_scraping():
     Este demo muestra cómo:
     1. Selenium abre un navegador real
     2. Espera a que JavaScript cargue el contenido
-    3. BeautifulSoup parsea el HTML renderizado
+    3. lxml parsea el HTML renderizado
     4. Extraemos los datos estructurados
     """)
     
-    scraper = CompensarSeleniumScraper(headless=False)  # headless=False para ver el navegador
+    scraper = CompensarSeleniumScraper(headless=True)  # COMPENSAR_SHOW_BROWSER=1 para ver el navegador
     
     try:
         if not scraper.start_driver():
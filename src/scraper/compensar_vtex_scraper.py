@@ -10,17 +10,130 @@ La estructura de datos que extraemos:
 - Precios: Categoría A, B, C, No afiliado
 """
 
+import asyncio
+import aiohttp
+import concurrent.futures
+import functools
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import orjson
 import re
 import os
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
-import time
 from tqdm import tqdm
+from selectolax.lexbor import LexborHTMLParser
 
+# Caché HTTP en disco (opcional): sin ella cada corrida vuelve a descargar todo
+try:
+    import requests_cache
+    from aiohttp_client_cache import CachedSession as AioCachedSession, SQLiteBackend
+    CACHE_AVAILABLE = True
+except ImportError:
+    CACHE_AVAILABLE = False
 
-@dataclass
+# Regex compiladas una sola vez (se aplican a cada <script> de cada página)
+_RE_PRODUCT_NAME = re.compile(r'"productName"\s*:\s*"([^"]+)"')
+_RE_PRODUCT_BLOCK = re.compile(r'\{[^{}]*"productName"\s*:\s*"([^"]+)"[^{}]*"Price"\s*:\s*([\d.]+)[^{}]*\}')
+
+# Decoder reutilizable: raw_decode parsea un valor JSON desde un offset y
+# se detiene al cerrarlo, ignorando lo que venga después en el script
+_JSON_DECODER = json.JSONDecoder()
+
+# Claves con el precio dentro de un producto del __STATE__, en orden de preferencia
+_STATE_PRICE_KEYS = ('Price', 'price', 'lowPrice')
+
+
+def _extract_state(text: str) -> Optional[Dict]:
+    """
+    Extrae el objeto JSON asignado a __STATE__ dentro de un script.
+    
+    🎓 raw_decode parsea desde la primera llave y para donde termina el
+    objeto: el escaneo lo hace el decoder en C, sin regex con [^{}]* que
+    puede hacer backtracking sobre scripts de megabytes.
+    
+    Returns:
+        El dict del estado, o None si no hay __STATE__ o no es JSON válido
+    """
+    idx = text.find('__STATE__')
+    if idx == -1:
+        return None
+    start = text.find('{', idx)
+    if start == -1:
+        return None
+    try:
+        state, _ = _JSON_DECODER.raw_decode(text, start)
+    except ValueError:
+        return None
+    return state
+
+
+def _state_price(node, state: Dict, depth: int = 0) -> Optional[float]:
+    """Busca el primer precio numérico bajo un nodo del __STATE__, siguiendo sus referencias"""
+    if depth > 6:
+        return None
+    if isinstance(node, dict):
+        # VTEX normaliza el estado: los hijos son {"type": "id", "id": "<clave>"}
+        if node.get('type') == 'id' and node.get('id') in state:
+            node = state[node['id']]
+        for key in _STATE_PRICE_KEYS:
+            value = node.get(key)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                return value
+        children = node.values()
+    elif isinstance(node, list):
+        children = node
+    else:
+        return None
+    for child in children:
+        if isinstance(child, (dict, list)):
+            price = _state_price(child, state, depth + 1)
+            if price is not None:
+                return price
+    return None
+
+
+def _extract_navigation_products(html: str) -> List[Tuple[str, Optional[float]]]:
+    """
+    Extrae (nombre, precio) de los productos embebidos en una página de navegación.
+    
+    🎓 Función top-level que devuelve solo tuplas: así se puede mandar a
+    un proceso del pool (picklable) y el parseo no compite por el GIL.
+    """
+    encontrados = []
+    
+    # La página carga con JavaScript, pero podemos encontrar
+    # datos embebidos en el HTML (Lexbor: árbol en C, sin objetos Python por nodo)
+    tree = LexborHTMLParser(html)
+    
+    # Buscar en scripts
+    for script in tree.css('script'):
+        text = script.text()
+        # Filtro barato: la mayoría de scripts (analytics, polyfills) no tienen productos
+        if not text or 'productName' not in text:
+            continue
+        
+        # VTEX embebe los datos en __STATE__: se parsea como JSON
+        state = _extract_state(text)
+        if state is not None:
+            encontrados.extend(
+                (item['productName'], _state_price(item, state))
+                for item in state.values()
+                if isinstance(item, dict)
+                and str(item.get('__typename', '')).startswith('Product')
+                and item.get('productName')
+            )
+        else:
+            # Plan B: objetos planos con nombre y precio juntos
+            encontrados.extend((name, float(price)) for name, price in _RE_PRODUCT_BLOCK.findall(text))
+    
+    return encontrados
+
+
+@dataclass(slots=True)
 class Precio:
     """Precios por categoría de afiliación"""
     desde: Optional[str] = None
@@ -32,7 +145,7 @@ class Precio:
     precio_oferta: Optional[float] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Producto:
     """Producto/Servicio de Compensar"""
     id: str
@@ -59,6 +172,7 @@ class CompensarVTEXScraper:
     BASE_URL = "https://www.tiendacompensar.com"
     API_URL = f"{BASE_URL}/api/catalog_system/pub"
     SEARCH_API = f"{API_URL}/products/search"
+    NAVIGATION_URL = f"{BASE_URL}/navegacion/category"
     
     # Mapeo de categorías
     CATEGORIAS = {
@@ -70,29 +184,91 @@ class CompensarVTEXScraper:
         "adulto-mayor": {"nombre": "Adulto Mayor", "id": None},
     }
     
-    SUBCATEGORIAS = [
+    # Tupla: lista fija, no se modifica en ejecución
+    SUBCATEGORIAS = (
         "turismo", "spa", "gimnasio", "natacion-y-buceo", "cursos",
         "planes", "musica", "actividades-recreativas", "actividades-culturales",
         "cocina", "bienestar-y-armonia", "pasadias", "practicas-dirigidas",
         "practicas-libres", "sistemas", "biblioteca", "bolos",
         "cine-y-entretenimiento", "manualidades", "salud-para-adulto-mayor",
         "clases-personalizadas", "cuidado-adulto-mayor"
-    ]
+    )
+    
+    # Caché de respuestas (SQLite): una hora basta para re-corridas durante desarrollo.
+    # Ruta absoluta, compartida con el caché de CompensarScraper: no depende del cwd
+    CACHE_DIR = Path.home() / ".cache" / "compensar"
+    CACHE_EXPIRE = 3600
     
-    def __init__(self, delay: float = 0.5):
+    def __init__(self, delay: float = 0.5, use_cache: bool = True):
         """
         Args:
             delay: Segundos entre requests
+            use_cache: Guardar las respuestas GET en disco (requiere requests-cache
+                y aiohttp-client-cache; si no están, se ignora)
         """
         self.delay = delay
-        self.session = requests.Session()
+        self.use_cache = use_cache and CACHE_AVAILABLE
+        if self.use_cache:
+            self.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            self.session = requests_cache.CachedSession(
+                str(self.CACHE_DIR / 'compensar'),
+                backend='sqlite',
+                expire_after=self.CACHE_EXPIRE,
+                allowable_methods=('GET',),
+                allowable_codes=(200,),
+            )
+        else:
+            self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': 'application/json, text/html, */*',
             'Accept-Language': 'es-CO,es;q=0.9',
             'Referer': self.BASE_URL,
+            # Sin 'br': requests solo lo descomprime si está instalado brotli
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive',
         })
+        # Pool más grande que el default (10) para reutilizar conexiones TLS
+        # abiertas, con reintentos ante rate limiting y errores del servidor
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.productos: List[Producto] = []
+        # Procesos para parsear HTML en paralelo (se crean al primer uso)
+        self._parse_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+    
+    @classmethod
+    @functools.lru_cache(maxsize=64)
+    def _nav_url(cls, subcategoria: str) -> str:
+        """URL de navegación de una subcategoría (se arma una vez por subcategoría)"""
+        return f"{cls.NAVIGATION_URL}/{subcategoria}"
+    
+    def _get_parse_pool(self) -> concurrent.futures.ProcessPoolExecutor:
+        """Pool de procesos de parseo, creado al primer uso"""
+        if self._parse_pool is None:
+            self._parse_pool = concurrent.futures.ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) // 2))
+        return self._parse_pool
+    
+    def _shutdown_parse_pool(self):
+        """Termina los procesos de parseo (se vuelven a crear si hacen falta)"""
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
+    
+    def close(self):
+        """Cierra la sesión HTTP y el pool de procesos de parseo"""
+        self._shutdown_parse_pool()
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
     
     def _get_category_tree(self) -> List[Dict]:
         """Obtiene el árbol de categorías de VTEX"""
@@ -143,18 +319,17 @@ class CompensarVTEXScraper:
     
     def _parse_search_page(self, html: str) -> Dict:
         """Parsea HTML de página de búsqueda si la API devuelve HTML"""
-        from bs4 import BeautifulSoup
-        
         products = []
-        soup = BeautifulSoup(html, 'lxml')
+        tree = LexborHTMLParser(html)
         
         # Intentar encontrar JSON embebido
-        scripts = soup.find_all('script')
-        for script in scripts:
-            if script.string:
+        for script in tree.css('script'):
+            text = script.text()
+            # Filtro barato antes de la regex: la mayoría de scripts (analytics,
+            # polyfills) no tienen productos
+            if text and 'productName' in text:
                 # Buscar datos de productos
-                matches = re.findall(r'\"productName\"\s*:\s*\"([^\"]+)\"', script.string)
-                for match in matches:
+                for match in _RE_PRODUCT_NAME.findall(text):
                     products.append({'productName': match})
         
         return {'products': products, 'total': len(products)}
@@ -164,42 +339,13 @@ class CompensarVTEXScraper:
         Scrapea una subcategoría usando la URL de navegación.
         """
         productos = []
-        url = f"{self.BASE_URL}/navegacion/category/{subcategoria}"
+        url = self._nav_url(subcategoria)
         
         print(f"\n📂 Scrapeando: {subcategoria}")
         
         try:
             resp = self.session.get(url, timeout=30)
-            html = resp.text
-            
-            # La página carga con JavaScript, pero podemos encontrar
-            # datos embebidos en el HTML
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(html, 'lxml')
-            
-            # Buscar en scripts
-            for script in soup.find_all('script'):
-                if script.string:
-                    text = script.string
-                    
-                    # Buscar productos en el JavaScript
-                    # VTEX a menudo embebe datos en __STATE__ o similar
-                    product_matches = re.findall(
-                        r'\{[^{}]*"productName"\s*:\s*"([^"]+)"[^{}]*"Price"\s*:\s*([\d.]+)[^{}]*\}',
-                        text
-                    )
-                    
-                    for match in product_matches:
-                        name, price = match
-                        productos.append(Producto(
-                            id=f"{subcategoria}-{len(productos)}",
-                            nombre=name,
-                            categoria_principal=categoria_principal,
-                            subcategoria=subcategoria,
-                            precio=Precio(desde=f"${float(price):,.0f}".replace(',', '.')),
-                            url=url
-                        ))
-            
+            productos = self._parse_navigation_html(resp.text, url, subcategoria, categoria_principal)
             print(f"   ✅ Encontrados: {len(productos)} productos")
             
         except Exception as e:
@@ -207,6 +353,29 @@ class CompensarVTEXScraper:
         
         return productos
     
+    def _parse_navigation_html(self, html: str, url: str, subcategoria: str,
+                               categoria_principal: str) -> List[Producto]:
+        """Extrae los productos embebidos en los scripts de una página de navegación"""
+        return self._build_navigation_products(
+            _extract_navigation_products(html), url, subcategoria, categoria_principal
+        )
+    
+    @staticmethod
+    def _build_navigation_products(encontrados: List[Tuple[str, Optional[float]]], url: str,
+                                   subcategoria: str, categoria_principal: str) -> List[Producto]:
+        """Convierte los pares (nombre, precio) de una página de navegación en Producto"""
+        return [
+            Producto(
+                id=f"{subcategoria}-{i}",
+                nombre=name,
+                categoria_principal=categoria_principal,
+                subcategoria=subcategoria,
+                precio=Precio(desde=f"${float(price):,.0f}".replace(',', '.') if price is not None else None),
+                url=url
+            )
+            for i, (name, price) in enumerate(encontrados)
+        ]
+    
     def scrape_buscapagina(self, subcategoria: str, categoria_principal: str = "General") -> List[Producto]:
         """
         Usa el endpoint buscapagina de VTEX para obtener productos.
@@ -214,79 +383,176 @@ class CompensarVTEXScraper:
         """
         productos = []
         
+        try:
+            resp = self.session.get(f"{self.BASE_URL}/buscapagina",
+                                    params=self._buscapagina_params(subcategoria), timeout=30)
+            if resp.status_code == 200:
+                productos = self._parse_buscapagina_html(resp.text, subcategoria, categoria_principal)
+                
+        except Exception as e:
+            print(f"⚠️ Error en buscapagina: {e}")
+        
+        return productos
+    
+    @staticmethod
+    def _buscapagina_params(subcategoria: str) -> Dict:
+        """Parámetros del endpoint buscapagina para una subcategoría"""
         # El endpoint buscapagina requiere conocer el ID de colección o categoría
         # Podemos intentar con diferentes parámetros
-        
-        url = f"{self.BASE_URL}/buscapagina"
-        params = {
+        return {
             'sl': subcategoria,
             'PS': 50,  # Page Size
             'cc': 50,
             'sm': 0,
             'O': 'OrderByTopSaleDESC'
         }
+    
+    def _parse_buscapagina_html(self, html: str, subcategoria: str,
+                                categoria_principal: str) -> List[Producto]:
+        """Parsea el HTML de productos que devuelve buscapagina"""
+        productos = []
+        tree = LexborHTMLParser(html)
         
-        try:
-            resp = self.session.get(url, params=params, timeout=30)
-            if resp.status_code == 200:
-                # Parsear HTML de productos
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(resp.text, 'lxml')
-                
-                # Buscar elementos de producto
-                items = soup.find_all('li')
-                for item in items:
-                    name_elem = item.find(['h2', 'h3', '.productName', '.product-name'])
-                    price_elem = item.find(class_=lambda x: x and 'price' in str(x).lower())
-                    
-                    if name_elem:
-                        nombre = name_elem.get_text(strip=True)
-                        precio_str = price_elem.get_text(strip=True) if price_elem else None
-                        
-                        productos.append(Producto(
-                            id=f"{subcategoria}-{len(productos)}",
-                            nombre=nombre,
-                            categoria_principal=categoria_principal,
-                            subcategoria=subcategoria,
-                            precio=Precio(desde=precio_str),
-                            url=f"{self.BASE_URL}/navegacion/category/{subcategoria}"
-                        ))
+        # Buscar elementos de producto
+        for item in tree.css('li'):
+            name_elem = item.css_first('h2, h3, .productName, .product-name')
+            # Clase que contenga "price" sin importar mayúsculas
+            price_elem = item.css_first('[class*="price" i]')
+            
+            if name_elem:
+                nombre = name_elem.text(strip=True)
+                precio_str = price_elem.text(strip=True) if price_elem else None
                 
-        except Exception as e:
-            print(f"⚠️ Error en buscapagina: {e}")
+                productos.append(Producto(
+                    id=f"{subcategoria}-{len(productos)}",
+                    nombre=nombre,
+                    categoria_principal=categoria_principal,
+                    subcategoria=subcategoria,
+                    precio=Precio(desde=precio_str),
+                    url=self._nav_url(subcategoria)
+                ))
         
         return productos
     
-    def scrape_all(self, subcategorias: Optional[List[str]] = None,
-                   categoria_principal: str = "General") -> List[Producto]:
+    # ============================================
+    # VERSIÓN ASYNC (aiohttp)
+    # ============================================
+    
+    async def _fetch(self, session: aiohttp.ClientSession, url: str,
+                     params: Optional[Dict] = None) -> Optional[str]:
+        """GET asíncrono; devuelve el HTML o None si el status no es 200"""
+        async with session.get(url, params=params) as resp:
+            if resp.status != 200:
+                return None
+            return await resp.text()
+    
+    async def _async_scrape_via_navigation(self, session: aiohttp.ClientSession, subcategoria: str,
+                                           categoria_principal: str) -> List[Producto]:
+        """Como scrape_via_navigation, pero sin bloquear el event loop en la red"""
+        url = self._nav_url(subcategoria)
+        try:
+            html = await self._fetch(session, url)
+            if html:
+                # El parseo (CPU) va a otro proceso; el event loop sigue atendiendo la red
+                loop = asyncio.get_running_loop()
+                encontrados = await loop.run_in_executor(self._get_parse_pool(), _extract_navigation_products, html)
+                return self._build_navigation_products(encontrados, url, subcategoria, categoria_principal)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"   ❌ Error en {subcategoria}: {e}")
+        return []
+    
+    async def _async_scrape_buscapagina(self, session: aiohttp.ClientSession, subcategoria: str,
+                                        categoria_principal: str) -> List[Producto]:
+        """Como scrape_buscapagina, pero sin bloquear el event loop en la red"""
+        try:
+            html = await self._fetch(session, f"{self.BASE_URL}/buscapagina",
+                                     self._buscapagina_params(subcategoria))
+            if html:
+                return self._parse_buscapagina_html(html, subcategoria, categoria_principal)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"⚠️ Error en buscapagina: {e}")
+        return []
+    
+    async def scrape_all_async(self, subcategorias: Optional[List[str]] = None,
+                               categoria_principal: str = "General",
+                               concurrency: int = 8) -> List[Producto]:
         """
-        Scrapea todas las subcategorías.
+        Scrapea todas las subcategorías en paralelo.
+        
+        🎓 Con requests cada subcategoría esperaba a la anterior (N × RTT);
+        aquí hasta `concurrency` van en vuelo a la vez. Las páginas de
+        navegación se parsean en el pool de procesos, así que la red y el
+        parseo se solapan; el HTML de buscapagina (solo el plan B) aún se
+        parsea en el event loop.
+        
+        Args:
+            subcategorias: Lista de subcategorías (None = todas)
+            categoria_principal: Categoría principal para asignar
+            concurrency: Máximo de subcategorías en vuelo
         """
         subcategorias = subcategorias or self.SUBCATEGORIAS
+        semaphore = asyncio.Semaphore(concurrency)
+        pbar = tqdm(total=len(subcategorias), desc="Scrapeando categorías")
         
-        for subcat in tqdm(subcategorias, desc="Scrapeando categorías"):
-            # Intentar primero con navegación
-            productos = self.scrape_via_navigation(subcat, categoria_principal)
-            
-            # Si no encontró nada, intentar buscapagina
-            if not productos:
-                productos = self.scrape_buscapagina(subcat, categoria_principal)
-            
+        async def scrape_one(session: aiohttp.ClientSession, subcat: str) -> List[Producto]:
+            async with semaphore:
+                # Intentar primero con navegación
+                productos = await self._async_scrape_via_navigation(session, subcat, categoria_principal)
+                
+                # Si no encontró nada, intentar buscapagina
+                if not productos:
+                    productos = await self._async_scrape_buscapagina(session, subcat, categoria_principal)
+                
+                # La pausa se queda dentro del semáforo: así se espacian los requests
+                await asyncio.sleep(self.delay)
+            pbar.update(1)
+            return productos
+        
+        connector = aiohttp.TCPConnector(limit=10, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=30)
+        session_kwargs = dict(headers=dict(self.session.headers), connector=connector, timeout=timeout)
+        if self.use_cache:
+            # Mismo criterio que la caché de requests, en su propio archivo SQLite
+            cache = SQLiteBackend(
+                str(self.CACHE_DIR / 'compensar_async'),
+                expire_after=self.CACHE_EXPIRE,
+                allowed_methods=('GET',),
+                allowed_codes=(200,),
+            )
+            session_cm = AioCachedSession(cache=cache, **session_kwargs)
+        else:
+            session_cm = aiohttp.ClientSession(**session_kwargs)
+        try:
+            async with session_cm as session:
+                results = await asyncio.gather(*(scrape_one(session, subcat) for subcat in subcategorias))
+        finally:
+            pbar.close()
+            # Los procesos no se reutilizan entre corridas: liberarlos aquí
+            self._shutdown_parse_pool()
+        
+        # gather conserva el orden de las subcategorías
+        for productos in results:
             self.productos.extend(productos)
-            time.sleep(self.delay)
         
         print(f"\n📊 Total productos scrapeados: {len(self.productos)}")
         return self.productos
     
+    def scrape_all(self, subcategorias: Optional[List[str]] = None,
+                   categoria_principal: str = "General") -> List[Producto]:
+        """
+        Scrapea todas las subcategorías (envoltorio síncrono de scrape_all_async).
+        """
+        return asyncio.run(self.scrape_all_async(subcategorias, categoria_principal))
+    
     def save_to_json(self, filepath: str):
         """Guarda productos en JSON"""
         os.makedirs(os.path.dirname(filepath) if os.path.dirname(filepath) else '.', exist_ok=True)
         
-        data = [p.to_dict() for p in self.productos]
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # orjson serializa los dataclasses directamente (sin copia con asdict) y escribe UTF-8
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(self.productos, option=orjson.OPT_INDENT_2))
         
-        print(f"💾 Guardados {len(data)} productos en: {filepath}")
+        print(f"💾 Guardados {len(self.productos)} productos en: {filepath}")
 
 
 def demo():
@@ -319,6 +585,8 @@ def demo():
         print("\n⚠️ No se encontraron productos con este método")
         print("   La página requiere JavaScript para cargar contenido.")
         print("   Usa el scraper de Selenium: compensar_selenium_scraper.py")
+    
+    scraper.close()
 
 
 if __name__ == "__main__":
@@ -5,14 +5,80 @@ SQLite database for storing scraped Compensar data.
 """
 
 import sqlite3
+from contextlib import contextmanager
+import threading
 import json
-from typing import Dict, List, Optional
+import orjson
+from typing import Dict, Iterable, Iterator, List, Optional
 from pathlib import Path
 import logging
+import re
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# First number in a price, with Colombian thousands separators ("$1.500.000").
+# Compiled once: _parse_price runs for every inserted product
+_RE_PRICE = re.compile(r'(\d{1,3}(?:[.,]\d{3})+|\d+)')
+
+# Upserts shared by the single-row and bulk insert paths
+_CATEGORY_UPSERT_SQL = '''
+    INSERT INTO categories (slug, name, description, parent_category)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(slug) DO UPDATE SET
+        name = COALESCE(excluded.name, categories.name),
+        description = COALESCE(excluded.description, categories.description),
+        parent_category = COALESCE(excluded.parent_category, categories.parent_category),
+        updated_at = CURRENT_TIMESTAMP
+'''
+
+_PRODUCT_UPSERT_SQL = '''
+    INSERT INTO products (
+        category_id, category_slug, name, description, price, 
+        price_numeric, price_from, image_url, product_url,
+        availability, rating, location, additional_data
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(product_url) DO UPDATE SET
+        name = excluded.name,
+        description = excluded.description,
+        price = excluded.price,
+        price_numeric = excluded.price_numeric,
+        image_url = excluded.image_url,
+        availability = excluded.availability,
+        updated_at = CURRENT_TIMESTAMP
+'''
+
+# Triggers that keep products_fts in sync with products
+_FTS_TRIGGERS = {
+    'products_ai': '''
+        CREATE TRIGGER IF NOT EXISTS products_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    ''',
+    'products_ad': '''
+        CREATE TRIGGER IF NOT EXISTS products_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+    ''',
+    'products_au': '''
+        CREATE TRIGGER IF NOT EXISTS products_au AFTER UPDATE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO products_fts(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    ''',
+}
+
+# Product keys stored in their own columns (everything else goes to additional_data)
+_PRODUCT_COLUMNS = frozenset([
+    'category', 'name', 'description', 'price', 'image_url',
+    'product_url', 'availability', 'rating', 'location',
+])
+
 
 class CompensarDatabase:
     """
@@ -29,13 +95,28 @@ class CompensarDatabase:
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self.connection: Optional[sqlite3.Connection] = None
+        # Set in _initialize_database; False when SQLite lacks FTS5
+        self._fts_enabled = False
+        # slug -> id of categories already upserted through this connection
+        self._category_id_cache: Dict[str, int] = {}
+        # Serializes writes from several threads; reentrant because
+        # insert_product calls insert_category while holding it
+        self._write_lock = threading.RLock()
         self._initialize_database()
     
     def _initialize_database(self) -> None:
         """Create database tables if they don't exist."""
-        self.connection = sqlite3.connect(self.db_path)
+        # Shared across threads (writes go through _write_lock); autocommit,
+        # so multi-statement writes open their transaction explicitly
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
         self.connection.row_factory = sqlite3.Row
         
+        # WAL + NORMAL: commits append to the log instead of fsyncing twice,
+        # and readers don't block the writer
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('PRAGMA busy_timeout=5000')
+        
         cursor = self.connection.cursor()
         
         # Categories table
@@ -92,10 +173,66 @@ class CompensarDatabase:
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_category ON products(category_slug)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_name ON products(name)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_price ON products(price_numeric)')
+        # Covers get_products_by_category: filter and ORDER BY name from the index
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_cat_name ON products(category_slug, name)')
+        
+        self._fts_enabled = self._initialize_fts(cursor)
         
-        self.connection.commit()
         logger.info(f"Database initialized at {self.db_path}")
     
+    def _initialize_fts(self, cursor: sqlite3.Cursor) -> bool:
+        """
+        Create the FTS5 index over product name and description.
+        
+        The index is an external-content table kept in sync by triggers, so
+        search_products can use it instead of scanning with LIKE '%...%'.
+        
+        Args:
+            cursor: Cursor of the open connection
+            
+        Returns:
+            True if full-text search is available
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'")
+        exists = cursor.fetchone() is not None
+        
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+                    name, description,
+                    content='products', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            logger.warning(f"FTS5 not available, search falls back to LIKE: {e}")
+            return False
+        
+        for sql in _FTS_TRIGGERS.values():
+            cursor.execute(sql)
+        
+        # Databases created before the index existed: index their rows once
+        if not exists:
+            cursor.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+        
+        return True
+    
+    @staticmethod
+    def _fts_query(query: str) -> str:
+        """
+        Turn free text into an FTS5 prefix query.
+        
+        Each word is quoted (so FTS5 operators in user input are literal)
+        and suffixed with * to match as a prefix; words are ANDed.
+        
+        Args:
+            query: Search term(s)
+            
+        Returns:
+            FTS5 MATCH expression, empty if the query has no words
+        """
+        return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in query.split())
+    
     def _parse_price(self, price_str: Optional[str]) -> Optional[float]:
         """
         Parse price string to numeric value.
@@ -106,23 +243,13 @@ class CompensarDatabase:
         Returns:
             Numeric price value or None
         """
-        if not price_str:
+        if not price_str or not isinstance(price_str, str):
             return None
         
-        try:
-            # Remove common text and symbols
-            clean = price_str.lower()
-            clean = clean.replace('desde:', '').replace('desde', '')
-            clean = clean.replace('$', '').replace(',', '').replace('.', '')
-            clean = clean.strip()
-            
-            # Try to extract number
-            import re
-            numbers = re.findall(r'\d+', clean)
-            if numbers:
-                return float(numbers[0])
-        except Exception:
-            pass
+        # "Desde", "$" and spaces are skipped by the search itself
+        match = _RE_PRICE.search(price_str)
+        if match:
+            return float(match.group(1).replace('.', '').replace(',', ''))
         
         return None
     
@@ -141,23 +268,25 @@ class CompensarDatabase:
         Returns:
             Category ID
         """
+        # Bare lookups (the per-product path) skip SQL once the slug is known;
+        # calls carrying new details still go through the upsert
+        if name is None and description is None and parent_category is None:
+            cached = self._category_id_cache.get(slug)
+            if cached is not None:
+                return cached
+        
         cursor = self.connection.cursor()
         
-        cursor.execute('''
-            INSERT INTO categories (slug, name, description, parent_category)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(slug) DO UPDATE SET
-                name = COALESCE(excluded.name, categories.name),
-                description = COALESCE(excluded.description, categories.description),
-                parent_category = COALESCE(excluded.parent_category, categories.parent_category),
-                updated_at = CURRENT_TIMESTAMP
-        ''', (slug, name or slug.replace('-', ' ').title(), description, parent_category))
-        
-        self.connection.commit()
-        
-        # Get the category ID
-        cursor.execute('SELECT id FROM categories WHERE slug = ?', (slug,))
-        return cursor.fetchone()[0]
+        with self._write_lock:
+            cursor.execute(_CATEGORY_UPSERT_SQL,
+                           (slug, name or slug.replace('-', ' ').title(), description, parent_category))
+            
+            # Get the category ID
+            cursor.execute('SELECT id FROM categories WHERE slug = ?', (slug,))
+            category_id = cursor.fetchone()[0]
+        
+        self._category_id_cache[slug] = category_id
+        return category_id
     
     def insert_product(self, product: Dict) -> Optional[int]:
         """
@@ -172,75 +301,157 @@ class CompensarDatabase:
         cursor = self.connection.cursor()
         
         try:
-            # Ensure category exists
-            category_slug = product.get('category', 'uncategorized')
-            category_id = self.insert_category(category_slug)
-            
-            # Parse price
-            price_numeric = self._parse_price(product.get('price'))
-            
-            # Prepare additional data as JSON
-            additional_data = {k: v for k, v in product.items() 
-                            if k not in ['category', 'name', 'description', 'price', 
-                                        'image_url', 'product_url', 'availability', 
-                                        'rating', 'location']}
-            
-            cursor.execute('''
-                INSERT INTO products (
-                    category_id, category_slug, name, description, price, 
-                    price_numeric, price_from, image_url, product_url,
-                    availability, rating, location, additional_data
-                )
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(product_url) DO UPDATE SET
-                    name = excluded.name,
-                    description = excluded.description,
-                    price = excluded.price,
-                    price_numeric = excluded.price_numeric,
-                    image_url = excluded.image_url,
-                    availability = excluded.availability,
-                    updated_at = CURRENT_TIMESTAMP
-            ''', (
-                category_id,
-                category_slug,
-                product.get('name'),
-                product.get('description'),
-                product.get('price'),
-                price_numeric,
-                product.get('price_from', False),
-                product.get('image_url'),
-                product.get('product_url'),
-                product.get('availability'),
-                product.get('rating'),
-                product.get('location'),
-                json.dumps(additional_data) if additional_data else None
-            ))
-            
-            self.connection.commit()
-            return cursor.lastrowid
+            with self._write_lock:
+                # Ensure category exists
+                category_slug = product.get('category', 'uncategorized')
+                category_id = self.insert_category(category_slug)
+                
+                cursor.execute(_PRODUCT_UPSERT_SQL, self._product_row(product, category_id))
+                return cursor.lastrowid
             
         except Exception as e:
             logger.error(f"Error inserting product: {e}")
             return None
     
+    def _product_row(self, product: Dict, category_id: int) -> tuple:
+        """
+        Build the parameter tuple for _PRODUCT_UPSERT_SQL.
+        
+        Args:
+            product: Product dictionary with fields
+            category_id: ID of the product's category
+            
+        Returns:
+            Row tuple in column order
+        """
+        # Prepare additional data as JSON
+        additional_data = {k: v for k, v in product.items() if k not in _PRODUCT_COLUMNS}
+        
+        return (
+            category_id,
+            product.get('category', 'uncategorized'),
+            product.get('name'),
+            product.get('description'),
+            product.get('price'),
+            self._parse_price(product.get('price')),
+            product.get('price_from', False),
+            product.get('image_url'),
+            product.get('product_url'),
+            product.get('availability'),
+            product.get('rating'),
+            product.get('location'),
+            json.dumps(additional_data) if additional_data else None
+        )
+    
     def insert_products_bulk(self, products: List[Dict]) -> int:
         """
         Insert multiple products in bulk.
         
+        All categories and products are upserted with executemany inside a
+        single transaction, so the whole batch costs one commit.
+        
         Args:
             products: List of product dictionaries
             
         Returns:
             Number of products inserted
         """
-        inserted = 0
-        for product in products:
-            if self.insert_product(product):
-                inserted += 1
+        # name is NOT NULL: such rows would abort the whole batch
+        valid = [p for p in products if p.get('name') is not None]
+        if not valid:
+            logger.info(f"Inserted 0/{len(products)} products")
+            return 0
+        
+        slugs = {p.get('category', 'uncategorized') for p in valid}
+        
+        try:
+            with self._write_lock, self._savepoint('insert_batch'):
+                cursor = self.connection.cursor()
+                cursor.executemany(_CATEGORY_UPSERT_SQL, [
+                    (slug, slug.replace('-', ' ').title(), None, None) for slug in slugs
+                ])
+                
+                placeholders = ','.join('?' * len(slugs))
+                cursor.execute(f'SELECT id, slug FROM categories WHERE slug IN ({placeholders})',
+                               list(slugs))
+                category_ids = {row['slug']: row['id'] for row in cursor.fetchall()}
+                self._category_id_cache.update(category_ids)
+                
+                cursor.executemany(_PRODUCT_UPSERT_SQL, [
+                    self._product_row(p, category_ids[p.get('category', 'uncategorized')])
+                    for p in valid
+                ])
+        except Exception as e:
+            logger.error(f"Error inserting products: {e}")
+            return 0
         
+        inserted = len(valid)
         logger.info(f"Inserted {inserted}/{len(products)} products")
         return inserted
     
+    @contextmanager
+    def _savepoint(self, name: str):
+        """
+        Run a block atomically.
+        
+        A savepoint commits on its own at top level, and nests inside an
+        open transaction (e.g. bulk_load) without committing it early.
+        
+        Args:
+            name: Savepoint name
+        """
+        self.connection.execute(f'SAVEPOINT {name}')
+        try:
+            yield
+        except BaseException:
+            self.connection.execute(f'ROLLBACK TO {name}')
+            self.connection.execute(f'RELEASE {name}')
+            # Ids cached inside the rolled-back block may not exist
+            self._category_id_cache.clear()
+            raise
+        self.connection.execute(f'RELEASE {name}')
+    
+    @contextmanager
+    def bulk_load(self):
+        """
+        Context manager for one-shot loads of many products.
+        
+        Everything inside runs in a single transaction with synchronous=OFF
+        (no fsync until the end). The FTS triggers are dropped for the
+        duration and the index is rebuilt once before committing, so the
+        load does not update the index row by row. Other threads' writes
+        wait until the load finishes.
+        
+        Example:
+            with db.bulk_load():
+                db.insert_products_bulk(all_products)
+        """
+        conn = self.connection
+        with self._write_lock:
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    if self._fts_enabled:
+                        for trigger in _FTS_TRIGGERS:
+                            conn.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+                    
+                    yield self
+                    
+                    if self._fts_enabled:
+                        for sql in _FTS_TRIGGERS.values():
+                            conn.execute(sql)
+                        conn.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+                except BaseException:
+                    # Also restores the dropped triggers (DDL is transactional)
+                    conn.execute('ROLLBACK')
+                    self._category_id_cache.clear()
+                    raise
+                conn.execute('COMMIT')
+            finally:
+                conn.execute('PRAGMA synchronous=NORMAL')
+    
     def log_scraping(self, category_slug: str, products_found: int, 
                     success: bool = True, error_message: Optional[str] = None) -> None:
         """
@@ -252,12 +463,49 @@ class CompensarDatabase:
             success: Whether scraping was successful
             error_message: Error message if failed
         """
+        with self._write_lock:
+            self.connection.execute('''
+                INSERT INTO scraping_logs (category_slug, products_found, success, error_message)
+                VALUES (?, ?, ?, ?)
+            ''', (category_slug, products_found, success, error_message))
+    
+    def _iter_rows(self, sql: str, params: tuple = ()) -> Iterator[Dict]:
+        """
+        Run a query and yield each row as a dict, without fetchall.
+        
+        Column names are read once from cursor.description instead of
+        being hashed again for every sqlite3.Row.
+        
+        Args:
+            sql: SELECT statement
+            params: Query parameters
+            
+        Yields:
+            Row dictionaries
+        """
         cursor = self.connection.cursor()
-        cursor.execute('''
-            INSERT INTO scraping_logs (category_slug, products_found, success, error_message)
-            VALUES (?, ?, ?, ?)
-        ''', (category_slug, products_found, success, error_message))
-        self.connection.commit()
+        cursor.execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+        for row in cursor:
+            yield dict(zip(columns, row))
+    
+    def iter_products(self, category_slug: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Iterate over products, optionally from a single category.
+        
+        Args:
+            category_slug: Category slug (None = all products)
+            
+        Yields:
+            Product dictionaries, ordered like get_products_by_category /
+            get_all_products
+        """
+        if category_slug is None:
+            return self._iter_rows('SELECT * FROM products ORDER BY category_slug, name')
+        return self._iter_rows('''
+            SELECT * FROM products WHERE category_slug = ?
+            ORDER BY name
+        ''', (category_slug,))
     
     def get_products_by_category(self, category_slug: str) -> List[Dict]:
         """
@@ -269,19 +517,11 @@ class CompensarDatabase:
         Returns:
             List of product dictionaries
         """
-        cursor = self.connection.cursor()
-        cursor.execute('''
-            SELECT * FROM products WHERE category_slug = ?
-            ORDER BY name
-        ''', (category_slug,))
-        
-        return [dict(row) for row in cursor.fetchall()]
+        return list(self.iter_products(category_slug))
     
     def get_all_products(self) -> List[Dict]:
         """Get all products from database."""
-        cursor = self.connection.cursor()
-        cursor.execute('SELECT * FROM products ORDER BY category_slug, name')
-        return [dict(row) for row in cursor.fetchall()]
+        return list(self.iter_products())
     
     def get_all_categories(self) -> List[Dict]:
         """Get all categories from database."""
@@ -306,25 +546,35 @@ class CompensarDatabase:
         """
         cursor = self.connection.cursor()
         
-        sql = '''
-            SELECT * FROM products 
-            WHERE (name LIKE ? OR description LIKE ?)
-        '''
-        params = [f'%{query}%', f'%{query}%']
+        match = self._fts_query(query) if self._fts_enabled else ''
+        if match:
+            # Word-prefix search through the FTS5 index
+            sql = '''
+                SELECT p.* FROM products_fts f
+                JOIN products p ON p.id = f.rowid
+                WHERE products_fts MATCH ?
+            '''
+            params = [match]
+        else:
+            sql = '''
+                SELECT p.* FROM products p
+                WHERE (p.name LIKE ? OR p.description LIKE ?)
+            '''
+            params = [f'%{query}%', f'%{query}%']
         
         if category:
-            sql += ' AND category_slug = ?'
+            sql += ' AND p.category_slug = ?'
             params.append(category)
         
         if min_price is not None:
-            sql += ' AND price_numeric >= ?'
+            sql += ' AND p.price_numeric >= ?'
             params.append(min_price)
         
         if max_price is not None:
-            sql += ' AND price_numeric <= ?'
+            sql += ' AND p.price_numeric <= ?'
             params.append(max_price)
         
-        sql += ' ORDER BY name'
+        sql += ' ORDER BY p.name'
         
         cursor.execute(sql, params)
         return [dict(row) for row in cursor.fetchall()]
@@ -338,17 +588,21 @@ class CompensarDatabase:
         """
         cursor = self.connection.cursor()
         
-        stats = {}
-        
-        # Total products
-        cursor.execute('SELECT COUNT(*) FROM products')
-        stats['total_products'] = cursor.fetchone()[0]
+        # Totals and price range in a single pass over products
+        # (MIN/MAX/AVG already skip NULL prices)
+        cursor.execute('''
+            SELECT COUNT(*), MIN(price_numeric), MAX(price_numeric), AVG(price_numeric),
+                   (SELECT COUNT(*) FROM categories)
+            FROM products
+        ''')
+        total_products, price_min, price_max, price_avg, total_categories = cursor.fetchone()
         
-        # Total categories
-        cursor.execute('SELECT COUNT(*) FROM categories')
-        stats['total_categories'] = cursor.fetchone()[0]
+        stats = {
+            'total_products': total_products,
+            'total_categories': total_categories,
+        }
         
-        # Products per category
+        # Products per category (index-only scan over idx_products_category)
         cursor.execute('''
             SELECT category_slug, COUNT(*) as count 
             FROM products 
@@ -357,15 +611,9 @@ class CompensarDatabase:
         ''')
         stats['products_per_category'] = {row[0]: row[1] for row in cursor.fetchall()}
         
-        # Price range
-        cursor.execute('''
-            SELECT MIN(price_numeric), MAX(price_numeric), AVG(price_numeric)
-            FROM products WHERE price_numeric IS NOT NULL
-        ''')
-        row = cursor.fetchone()
-        stats['price_min'] = row[0]
-        stats['price_max'] = row[1]
-        stats['price_avg'] = row[2]
+        stats['price_min'] = price_min
+        stats['price_max'] = price_max
+        stats['price_avg'] = price_avg
         
         # Last scraping info
         cursor.execute('''
@@ -381,21 +629,44 @@ class CompensarDatabase:
         """
         Export all data to JSON file.
         
+        Tables are streamed row by row, so memory stays at one fetch chunk
+        regardless of how many products are stored.
+        
         Args:
             filepath: Output file path
         """
-        data = {
-            'categories': self.get_all_categories(),
-            'products': self.get_all_products(),
-            'statistics': self.get_statistics(),
-            'exported_at': datetime.now().isoformat()
-        }
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+        with open(filepath, 'wb') as f:
+            f.write(b'{\n  "categories": ')
+            self._write_json_rows(f, self._iter_rows('SELECT * FROM categories ORDER BY slug'))
+            
+            f.write(b',\n  "products": ')
+            self._write_json_rows(f, self.iter_products())
+            
+            f.write(b',\n  "statistics": ')
+            f.write(orjson.dumps(self.get_statistics(), default=str, option=orjson.OPT_NON_STR_KEYS))
+            f.write(b',\n  "exported_at": ')
+            f.write(orjson.dumps(datetime.now().isoformat()))
+            f.write(b'\n}\n')
         
         logger.info(f"Data exported to {filepath}")
     
+    @staticmethod
+    def _write_json_rows(f, rows: Iterable[Dict]) -> None:
+        """
+        Write rows as a JSON array, one object per line.
+        
+        Args:
+            f: Binary file to write to
+            rows: Row dictionaries (consumed lazily)
+        """
+        separator = b'[\n    '
+        for row in rows:
+            f.write(separator)
+            f.write(orjson.dumps(row, default=str))
+            separator = b',\n    '
+        # Empty result: the opening bracket was never written
+        f.write(b'[]' if separator == b'[\n    ' else b'\n  ]')
+    
     def close(self) -> None:
         """Close database connection."""
         if self.connection:
@@ -4,71 +4,165 @@
 Busca endpoints de API que podamos usar directamente.
 """
 
-import requests
+import httpx
 import json
+import orjson
 import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+# Todas las formas de URL de API en una sola regex: el HTML se recorre una vez.
+# Cada alternativa tiene su propio grupo; el que participó trae la URL.
+# Solo rutas relativas al sitio: "/" seguido de algo que no sea otra "/"
+# (el filtro va dentro de la regex, no en un bucle después).
+# Sin re.IGNORECASE global: los identificadores JS (fetch, .get, endpoint)
+# distinguen mayúsculas; solo "api" y "json" se aceptan en cualquier caso
+API_PATTERN = re.compile(
+    r'["\']('
+    r'/(?i:api)[^"\']*'
+    r'|/(?!/)[^"\']*\.(?i:json)'
+    r')["\']'
+    r'|fetch\(["\'](/(?!/)[^"\']+)["\']'
+    r'|\.get\(["\'](/(?!/)[^"\']+)["\']'
+    r'|endpoint["\s:]+["\'](/(?!/)[^"\']+)["\']'
+)
+
+# Estado JSON embebido (se reportan por separado, una por patrón)
+JSON_PATTERNS = [
+    re.compile(r'window\.__STATE__\s*=\s*({[^;]+})'),
+    re.compile(r'window\.__INITIAL_STATE__\s*=\s*({[^;]+})'),
+    re.compile(r'__NEXT_DATA__[^>]*>([^<]+)<'),
+    re.compile(r'data-state="([^"]+)"'),
+]
+
+# Consulta GraphQL de prueba, serializada una sola vez: los mismos bytes se
+# envían a todos los endpoints candidatos
+GRAPHQL_PAYLOAD = json.dumps({
+    "query": """
+        query products {
+            products(first: 10) {
+                items {
+                    productName
+                    priceRange {
+                        sellingPrice {
+                            lowPrice
+                        }
+                    }
+                }
+            }
+        }
+    """
+}).encode()
+GRAPHQL_HEADERS = {'Content-Type': 'application/json'}
+
+# Cliente compartido del módulo (se crea al primer uso)
+_CLIENT: Optional[httpx.Client] = None
+
+
+def _get_client() -> httpx.Client:
+    """
+    Devuelve el cliente HTTP compartido.
+    
+    🎓 Todas las pruebas van al mismo host y VTEX sirve HTTP/2: las
+    peticiones de todos los hilos se multiplexan sobre una sola conexión
+    TCP+TLS, así que solo la primera paga el handshake. El transporte
+    reintenta los fallos de conexión.
+    """
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = httpx.Client(
+            headers={
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+                'Accept': 'application/json, text/html, */*',
+                'Accept-Language': 'es-CO,es;q=0.9',
+                # Explícito: algunos endpoints VTEX solo comprimen si se pide
+                'Accept-Encoding': 'gzip, deflate, br',
+            },
+            timeout=10.0,
+            follow_redirects=True,
+            transport=httpx.HTTPTransport(
+                http2=True,
+                retries=2,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            ),
+        )
+    return _CLIENT
+
 
 def investigate_api():
     """Busca APIs internas en la página de Compensar"""
     
-    session = requests.Session()
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-        'Accept': 'application/json, text/html, */*',
-        'Accept-Language': 'es-CO,es;q=0.9',
-    })
+    client = _get_client()
+    
+    base_url = "https://www.tiendacompensar.com"
+    
+    vtex_endpoints = [
+        "/api/catalog_system/pub/products/search",
+        "/api/catalog_system/pub/category/tree/3",
+        "/api/io/safedata/CL/documents",
+        "/_v/segment/routing/vtex.store@2.x/product",
+        "/api/checkout/pub/orderForm/simulation",
+    ]
+    
+    search_urls = [
+        f"{base_url}/api/catalog_system/pub/products/search?fq=C:/1/",
+        f"{base_url}/api/catalog_system/pub/products/search/turismo",
+        f"{base_url}/_search?query=turismo",
+        f"{base_url}/buscapagina?sl=&PS=12&cc=12&sm=0&O=OrderByTopSaleDESC",
+    ]
+    
+    graphql_endpoints = [
+        f"{base_url}/_v/public/graphql/v1",
+        f"{base_url}/graphql",
+        f"{base_url}/api/graphql",
+    ]
     
     print("🔍 Buscando APIs internas de Tienda Compensar...")
     print("=" * 60)
     
+    # 🎓 Todas las peticiones salen en paralelo: el tiempo total es el de la
+    # más lenta, no la suma. Cada sección luego lee sus resultados en orden
+    # (result() re-lanza la excepción de la petición, si la hubo)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        home_future = executor.submit(client.get, base_url)
+        vtex_futures = [
+            (endpoint, executor.submit(client.get, f"{base_url}{endpoint}", timeout=10))
+            for endpoint in vtex_endpoints
+        ]
+        turismo_future = executor.submit(client.get, f"{base_url}/navegacion/category/turismo")
+        search_futures = [
+            (url, executor.submit(client.get, url, timeout=10))
+            for url in search_urls
+        ]
+        graphql_futures = [
+            (endpoint, executor.submit(client.post, endpoint, content=GRAPHQL_PAYLOAD,
+                                        headers=GRAPHQL_HEADERS, timeout=10))
+            for endpoint in graphql_endpoints
+        ]
+    
     # 1. Revisar el HTML base
     print("\n📄 Analizando HTML base...")
-    resp = session.get("https://www.tiendacompensar.com")
+    resp = home_future.result()
     html = resp.text
     
-    # Buscar URLs de API en el JavaScript
-    api_patterns = [
-        r'["\'](https?://[^"\']*api[^"\']*)["\']',
-        r'["\'](/api[^"\']*)["\']',
-        r'["\'](https?://[^"\']*\.json)["\']',
-        r'["\'](/[^"\']*\.json)["\']',
-        r'fetch\(["\']([^"\']+)["\']',
-        r'\.get\(["\']([^"\']+)["\']',
-        r'endpoint["\s:]+["\']([^"\']+)["\']',
-    ]
-    
-    found_apis = set()
-    for pattern in api_patterns:
-        matches = re.findall(pattern, html, re.IGNORECASE)
-        found_apis.update(matches)
+    # Buscar URLs de API en el JavaScript (una sola pasada)
+    found_apis = {match.group(match.lastindex) for match in API_PATTERN.finditer(html)}
     
     if found_apis:
         print("\n✅ APIs encontradas:")
         for api in sorted(found_apis):
-            if api.startswith('/') and not api.startswith('//'):
-                print(f"   {api}")
+            print(f"   {api}")
     
     # 2. Probar endpoints VTEX comunes (Compensar parece usar VTEX)
     print("\n🔍 Probando endpoints VTEX...")
     
-    vtex_endpoints = [
-        "/api/catalog_system/pub/products/search",
-        "/api/catalog_system/pub/category/tree/3",
-        "/api/io/safedata/CL/documents",
-        "/_v/segment/routing/vtex.store@2.x/product",
-        "/api/checkout/pub/orderForm/simulation",
-    ]
-    
-    base_url = "https://www.tiendacompensar.com"
-    
-    for endpoint in vtex_endpoints:
+    for endpoint, future in vtex_futures:
         try:
-            url = f"{base_url}{endpoint}"
-            resp = session.get(url, timeout=10)
+            resp = future.result()
             if resp.status_code == 200:
                 print(f"   ✅ {endpoint} - {resp.status_code}")
                 try:
-                    data = resp.json()
+                    data = orjson.loads(resp.content)
                     print(f"      Tipo de respuesta: {type(data).__name__}")
                     if isinstance(data, list):
                         print(f"      Items: {len(data)}")
@@ -83,24 +177,17 @@ def investigate_api():
     
     # 3. Buscar en la página de turismo
     print("\n🔍 Analizando página de turismo...")
-    resp = session.get("https://www.tiendacompensar.com/navegacion/category/turismo")
+    resp = turismo_future.result()
     turismo_html = resp.text
     
     # Buscar datos JSON embebidos
-    json_patterns = [
-        r'window\.__STATE__\s*=\s*({[^;]+})',
-        r'window\.__INITIAL_STATE__\s*=\s*({[^;]+})',
-        r'__NEXT_DATA__[^>]*>([^<]+)<',
-        r'data-state="([^"]+)"',
-    ]
-    
-    for pattern in json_patterns:
-        matches = re.findall(pattern, turismo_html)
+    for pattern in JSON_PATTERNS:
+        matches = pattern.findall(turismo_html)
         if matches:
-            print(f"   ✅ Encontrado estado embebido: {pattern[:30]}...")
+            print(f"   ✅ Encontrado estado embebido: {pattern.pattern[:30]}...")
             for match in matches[:1]:
                 try:
-                    data = json.loads(match)
+                    data = orjson.loads(match)
                     print(f"      Tipo: {type(data).__name__}")
                     if isinstance(data, dict):
                         print(f"      Keys: {list(data.keys())[:5]}")
@@ -110,16 +197,9 @@ def investigate_api():
     # 4. Revisar Network calls típicas
     print("\n🔍 Probando URLs de búsqueda...")
     
-    search_urls = [
-        f"{base_url}/api/catalog_system/pub/products/search?fq=C:/1/",
-        f"{base_url}/api/catalog_system/pub/products/search/turismo",
-        f"{base_url}/_search?query=turismo",
-        f"{base_url}/buscapagina?sl=&PS=12&cc=12&sm=0&O=OrderByTopSaleDESC",
-    ]
-    
-    for url in search_urls:
+    for url, future in search_futures:
         try:
-            resp = session.get(url, timeout=10)
+            resp = future.result()
             if resp.status_code == 200 and len(resp.content) > 100:
                 print(f"   ✅ {url[:50]}...")
                 print(f"      Status: {resp.status_code}, Size: {len(resp.content)} bytes")
@@ -129,32 +209,9 @@ def investigate_api():
     # 5. Intentar GraphQL (común en VTEX)
     print("\n🔍 Probando GraphQL...")
     
-    graphql_query = {
-        "query": """
-            query products {
-                products(first: 10) {
-                    items {
-                        productName
-                        priceRange {
-                            sellingPrice {
-                                lowPrice
-                            }
-                        }
-                    }
-                }
-            }
-        """
-    }
-    
-    graphql_endpoints = [
-        f"{base_url}/_v/public/graphql/v1",
-        f"{base_url}/graphql",
-        f"{base_url}/api/graphql",
-    ]
-    
-    for endpoint in graphql_endpoints:
+    for endpoint, future in graphql_futures:
         try:
-            resp = session.post(endpoint, json=graphql_query, timeout=10)
+            resp = future.result()
             if resp.status_code in [200, 400]:  # 400 puede indicar que existe pero query inválida
                 print(f"   📍 GraphQL endpoint: {endpoint} - {resp.status_code}")
         except:
@@ -6,7 +6,70 @@ para poder hacer hover correctamente.
 """
 
 import asyncio
-from playwright.async_api import async_playwright
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+
+
+# Precio actual como número: del atributo data-price si la página lo
+# expone (valor crudo, sin formato), si no del texto "$65.000" del primer
+# elemento de precio. null si no hay precio
+PRICE_READ_JS = """() => {
+    const dp = document.querySelector('[data-price]');
+    if (dp) {
+        const value = parseFloat(dp.getAttribute('data-price'));
+        if (!Number.isNaN(value)) return value;
+    }
+    const el = document.querySelector('[class*="price"]');
+    const digits = (el?.textContent || '').replace(/[^0-9]/g, '');
+    return digits ? Number(digits) : null;
+}"""
+
+# Devuelve {price} cuando el precio deja de ser `old` (así la espera ya
+# trae el precio nuevo, sin otra lectura aparte)
+PRICE_CHANGED_JS = f"""(old) => {{
+    const now = ({PRICE_READ_JS})();
+    return now !== null && now !== old ? {{price: now}} : null;
+}}"""
+
+# 🎓 Consultas en lote: evaluate_all corre en el navegador sobre todos los
+# elementos del locator y devuelve un solo JSON (un viaje de ida y vuelta
+# en vez de uno por elemento y atributo)
+BUTTONS_JS = """els => ({
+    total: els.length,
+    items: els.slice(0, 20).map(e => ({text: e.textContent, cls: e.getAttribute('class') || ''})),
+})"""
+
+# Un solo recorrido del DOM para todas las etiquetas: para cada una, los
+# elementos más internos cuyo texto (normalizado) es exactamente la etiqueta.
+# Los primeros 5 quedan marcados con data-inv-label para poder hacer hover
+FIND_LABELS_JS = """wanted => {
+    const found = Object.fromEntries(wanted.map(w => [w, {total: 0, items: []}]));
+    const norm = el => (el.textContent || '').replace(/\\s+/g, ' ').trim();
+    for (const el of document.body.querySelectorAll('*')) {
+        if (el.closest('script, style')) continue;
+        const text = norm(el);
+        if (!Object.hasOwn(found, text)) continue;
+        // Solo el elemento más interno con ese texto
+        if ([...el.children].some(c => norm(c) === text)) continue;
+        const group = found[text];
+        if (group.items.length < 5) {
+            const mark = `${wanted.indexOf(text)}-${group.items.length}`;
+            el.setAttribute('data-inv-label', mark);
+            group.items.push({
+                tag: el.tagName,
+                cls: el.getAttribute('class') || '',
+                parent: el.parentElement?.className || '',
+                mark: mark,
+            });
+        }
+        group.total++;
+    }
+    return found;
+}"""
+
+SELECTOR_TEXTS_JS = """els => ({
+    total: els.length,
+    texts: els.slice(0, 3).map(e => e.textContent || ''),
+})"""
 
 
 async def investigate_price_structure():
@@ -24,8 +87,14 @@ async def investigate_price_structure():
         url = "https://www.tiendacompensar.com/lagosol/pasadia-parque-acuatico-lagosol-sin-transporte/HER-B-ALJ-PAS-PLF-002"
         
         print(f"\n📡 Navegando a: {url}")
-        await page.goto(url, wait_until='networkidle')
-        await page.wait_for_timeout(3000)
+        # En vez de networkidle + 3 s fijos: esperar justo a que aparezca un precio
+        await page.goto(url, wait_until='domcontentloaded')
+        # Locator del primer precio (la lectura durante el hover va por PRICE_READ_JS)
+        price_loc = page.locator('[class*="price"]').first
+        try:
+            await price_loc.wait_for(timeout=5000)
+        except PlaywrightTimeoutError:
+            print("⚠️ No apareció ningún precio en 5 s, se continúa igual")
         
         # Tomar screenshot
         await page.screenshot(path="data/compensar/debug_price_buttons.png", full_page=True)
@@ -35,45 +104,44 @@ async def investigate_price_structure():
         print("\n🔍 Buscando sección de precios...")
         
         # Buscar todos los botones
-        buttons = await page.locator('button').all()
-        print(f"\n📌 Encontrados {len(buttons)} botones en la página:")
-        for i, btn in enumerate(buttons[:20]):  # Limitar a 20
-            try:
-                text = await btn.text_content()
-                class_attr = await btn.get_attribute('class') or ''
-                if text:
-                    print(f"   {i+1}. '{text.strip()[:30]}' | class: {class_attr[:50]}")
-            except:
-                continue
+        buttons = await page.locator('button').evaluate_all(BUTTONS_JS)
+        print(f"\n📌 Encontrados {buttons['total']} botones en la página:")
+        for i, btn in enumerate(buttons['items']):  # Limitado a 20 en BUTTONS_JS
+            if btn['text']:
+                print(f"   {i+1}. '{btn['text'].strip()[:30]}' | class: {btn['cls'][:50]}")
         
         # Buscar elementos que contengan A, B, C
         print("\n🔍 Buscando elementos con texto A, B, C, No afiliado...")
         
-        # Buscar por texto exacto
-        for letter in ['A', 'B', 'C', 'No afiliado']:
+        # Buscar por texto exacto (todas las etiquetas en un solo viaje)
+        labels = ['A', 'B', 'C', 'No afiliado']
+        try:
+            found = await page.evaluate(FIND_LABELS_JS, labels)
+        except Exception as e:
+            print(f"   Error buscando etiquetas: {e}")
+            found = {}
+        
+        for letter, elements in found.items():
             try:
-                elements = await page.locator(f'text="{letter}"').all()
-                print(f"\n   '{letter}': {len(elements)} elementos encontrados")
+                print(f"\n   '{letter}': {elements['total']} elementos encontrados")
                 
-                for i, elem in enumerate(elements[:5]):
+                for i, info in enumerate(elements['items']):
                     try:
-                        tag = await elem.evaluate('el => el.tagName')
-                        class_attr = await elem.get_attribute('class') or ''
-                        parent_class = await elem.evaluate('el => el.parentElement?.className || ""')
-                        
-                        print(f"      {i+1}. <{tag}> class='{class_attr[:40]}' parent='{parent_class[:40]}'")
+                        print(f"      {i+1}. <{info['tag']}> class='{info['cls'][:40]}' parent='{info['parent'][:40]}'")
                         
                         # Intentar hacer hover y ver si cambia algo
                         if letter in ['A', 'B', 'C']:
                             # Obtener precio antes del hover
-                            price_before = await page.locator('[class*="price"]').first.text_content()
-                            
-                            # Hacer hover
-                            await elem.hover()
-                            await page.wait_for_timeout(500)
+                            price_before = await page.evaluate(PRICE_READ_JS)
                             
-                            # Obtener precio después del hover
-                            price_after = await page.locator('[class*="price"]').first.text_content()
+                            # Hacer hover y esperar (máx. 1 s) a que el precio cambie
+                            await page.locator(f'[data-inv-label="{info["mark"]}"]').hover()
+                            # (la espera devuelve el precio después del hover)
+                            try:
+                                changed = await page.wait_for_function(PRICE_CHANGED_JS, arg=price_before, timeout=1000)
+                                price_after = (await changed.json_value())['price']
+                            except PlaywrightTimeoutError:
+                                price_after = price_before
                             
                             if price_before != price_after:
                                 print(f"         ✅ ¡HOVER FUNCIONA! Precio cambió: {price_before} → {price_after}")
@@ -106,11 +174,10 @@ async def investigate_price_structure():
         
         for selector in selectors_to_try:
             try:
-                elements = await page.locator(selector).all()
-                if elements:
-                    print(f"   ✅ '{selector}': {len(elements)} elementos")
-                    for i, elem in enumerate(elements[:3]):
-                        text = await elem.text_content() or ""
+                elements = await page.locator(selector).evaluate_all(SELECTOR_TEXTS_JS)
+                if elements['total']:
+                    print(f"   ✅ '{selector}': {elements['total']} elementos")
+                    for text in elements['texts']:
                         print(f"      → '{text.strip()[:50]}'")
             except:
                 continue
@@ -23,6 +23,7 @@ USO:
 import asyncio
 import argparse
 import sys
+from collections import Counter
 from pathlib import Path
 from datetime import datetime
 
@@ -41,6 +42,17 @@ except ImportError as e:
     PLAYWRIGHT_AVAILABLE = False
 
 
+# Subcategorías válidas (las mismas del epílogo): se validan al parsear los
+# argumentos, antes de gastar segundos arrancando el navegador
+VALID_SUBCATS = frozenset({
+    "turismo", "spa", "gimnasio", "natacion-y-buceo", "cursos", "planes", "musica",
+    "actividades-recreativas", "actividades-culturales", "cocina", "bienestar-y-armonia",
+    "pasadias", "practicas-dirigidas", "practicas-libres", "sistemas", "biblioteca",
+    "bolos", "cine-y-entretenimiento", "manualidades", "salud-para-adulto-mayor",
+    "clases-personalizadas", "cuidado-adulto-mayor", "activacion-adulto-mayor",
+})
+
+
 def parse_args():
     """Parsea argumentos de línea de comandos"""
     parser = argparse.ArgumentParser(
@@ -66,6 +78,8 @@ EJEMPLOS:
         '--categoria', '-c',
         nargs='+',
         dest='categorias',
+        choices=sorted(VALID_SUBCATS),
+        metavar='SUBCAT',
         help='Subcategorías a scrapear (si no se especifica, scrapea todas)'
     )
     
@@ -96,6 +110,14 @@ EJEMPLOS:
         help='Milisegundos de delay entre acciones (para debug)'
     )
     
+    parser.add_argument(
+        '--concurrency', '-j',
+        type=int,
+        default=4,
+        metavar='N',
+        help='Subcategorías scrapeadas en paralelo (default: 4)'
+    )
+    
     parser.add_argument(
         '--demo',
         action='store_true',
@@ -144,36 +166,39 @@ async def run_scraper(args):
             subcategorias = None  # Todas
             print(f"\n📋 Scrapeando TODAS las categorías ({len(scraper.SUBCATEGORIAS)} total)")
         
-        # Ejecutar scraping
+        # Ejecutar scraping: cada subcategoría terminada se guarda al momento
+        # (JSONL + SQLite por lotes), así un corte no pierde lo ya scrapeado
+        output_dir = Path(args.output)
+        jsonl_path = output_dir / "productos.jsonl"
+        db_path = output_dir / "compensar.db"
         await scraper.scrape_all(
             subcategorias=subcategorias,
-            categoria_principal="General"
+            categoria_principal="General",
+            concurrency=args.concurrency,
+            stream_dir=str(output_dir),
+            keep_in_memory=False
         )
         
+        # Resumen leído del JSONL, producto a producto
+        total = promociones = 0
+        subcats = Counter()
+        for p in scraper.iter_jsonl(str(jsonl_path)):
+            total += 1
+            promociones += bool(p['promocion'])
+            subcats[p['subcategoria']] += 1
+        
         # Guardar resultados
-        if scraper.productos:
-            output_dir = Path(args.output)
-            output_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Guardar JSON
+        if total:
+            # Guardar JSON (convertido desde el JSONL)
             json_path = output_dir / "productos.json"
-            scraper.save_to_json(str(json_path))
-            
-            # Guardar SQLite
-            db_path = output_dir / "compensar.db"
-            scraper.save_to_sqlite(str(db_path))
+            scraper.jsonl_to_json(str(jsonl_path), str(json_path))
             
             # Resumen
             print("\n" + "=" * 70)
             print("📊 RESUMEN FINAL")
             print("=" * 70)
-            print(f"   ✅ Total productos: {len(scraper.productos)}")
-            print(f"   🏷️  En promoción: {sum(1 for p in scraper.productos if p.promocion)}")
-            
-            # Productos por subcategoría
-            subcats = {}
-            for p in scraper.productos:
-                subcats[p.subcategoria] = subcats.get(p.subcategoria, 0) + 1
+            print(f"   ✅ Total productos: {total}")
+            print(f"   🏷️  En promoción: {promociones}")
             
             print("\n   📂 Productos por subcategoría:")
             for subcat, count in sorted(subcats.items()):
@@ -181,6 +206,7 @@ async def run_scraper(args):
             
             print(f"\n   💾 Archivos guardados:")
             print(f"      JSON: {json_path}")
+            print(f"      JSONL: {jsonl_path}")
             print(f"      SQLite: {db_path}")
             
             return 0
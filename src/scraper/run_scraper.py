@@ -6,6 +6,9 @@ Run this script to scrape Tienda Compensar and populate the database.
 """
 
 import argparse
+from collections import Counter
+from datetime import date
+import json
 import sys
 import logging
 from pathlib import Path
@@ -31,6 +34,38 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _cached_discover(db_path: str, delay: float, use_cache: bool = True) -> list:
+    """
+    Discover categories, reusing today's result if it is already on disk.
+    
+    The category tree changes rarely, so it is cached as JSON next to the
+    database in ``.cache/categories-YYYYMMDD.json`` (one file per day).
+    
+    Args:
+        db_path: Path to the SQLite database; the cache lives beside it
+        delay: Delay between requests for the scraper
+        use_cache: Read/write the daily cache file
+        
+    Returns:
+        List of category slugs
+    """
+    cache_file = (Path(db_path).parent / '.cache'
+                  / f"categories-{date.today():%Y%m%d}.json")
+    
+    if use_cache and cache_file.exists():
+        logger.info(f"Using cached categories from {cache_file}")
+        return json.loads(cache_file.read_text())
+    
+    with CompensarScraper(delay=delay) as scraper:
+        categories = scraper.discover_all_categories()
+    
+    # Don't cache an empty result (e.g. when the network failed)
+    if use_cache and categories:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        cache_file.write_text(json.dumps(categories))
+    return categories
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Scrape Tienda Compensar products and services'
@@ -65,6 +100,11 @@ def main():
         action='store_true',
         help='Discover all available categories'
     )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help="Ignore today's cached category discovery"
+    )
     
     args = parser.parse_args()
     
@@ -74,8 +114,8 @@ def main():
     try:
         if args.discover:
             # Discover categories first
-            scraper = CompensarScraper(delay=args.delay)
-            categories = scraper.discover_all_categories()
+            categories = _cached_discover(args.db_path, args.delay,
+                                          use_cache=not args.no_cache)
             print("\n📂 Discovered Categories:")
             for cat in sorted(categories):
                 print(f"  - {cat}")
@@ -95,14 +135,14 @@ def main():
             if not SELENIUM_AVAILABLE:
                 print("❌ Selenium not installed. Install with: pip install selenium webdriver-manager")
                 print("   Falling back to BeautifulSoup...")
-                scraper = CompensarScraper(delay=args.delay)
-                products = scraper.scrape_all_categories(categories)
+                with CompensarScraper(delay=args.delay) as scraper:
+                    products = scraper.scrape_all_categories(categories)
             else:
                 with SeleniumCompensarScraper(headless=True) as scraper:
                     products = scraper.scrape_all_categories(categories)
         else:
-            scraper = CompensarScraper(delay=args.delay)
-            products = scraper.scrape_all_categories(categories)
+            with CompensarScraper(delay=args.delay) as scraper:
+                products = scraper.scrape_all_categories(categories)
         
         # Save to database
         if products:
@@ -110,10 +150,10 @@ def main():
             inserted = db.insert_products_bulk(products)
             print(f"   Inserted: {inserted} products")
             
-            # Log scraping
+            # Log scraping (one pass over products, not one per category)
+            counts = Counter(p.get('category') for p in products)
             for category in categories:
-                cat_products = [p for p in products if p.get('category') == category]
-                db.log_scraping(category, len(cat_products), success=True)
+                db.log_scraping(category, counts.get(category, 0), success=True)
         else:
             print("\n⚠️  No products found. The website might use JavaScript rendering.")
             print("   Try running with --use-selenium flag")
@@ -23,16 +23,25 @@ Uso:
 """
 
 import asyncio
+import hashlib
 import json
+import orjson
 import os
+import random
 import sys
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
 
 # Agregar path del proyecto
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from src.scraper.compensar_playwright_scraper import CompensarPlaywrightScraper, PLAYWRIGHT_AVAILABLE
+from src.scraper.compensar_playwright_scraper import (
+    BrowserPool,
+    CompensarPlaywrightScraper,
+    PLAYWRIGHT_AVAILABLE,
+    normalize_prices,
+)
 from src.scraper.supabase_sync import SupabaseSync, load_productos_from_json
 
 
@@ -104,6 +113,12 @@ CATEGORIAS_A_SCRAPEAR = {
     }
 }
 
+# Subcategorías scrapeadas a la vez (cada una en su propio BrowserContext)
+MAX_PARALLEL = 4
+
+# Subcategorías que scrapea un contexto antes de reciclarlo (acota memoria)
+CONTEXT_MAX_PAGES = 10
+
 # Subcategorías específicas para hobbies/situaciones
 SUBCATEGORIAS_PRIORITARIAS = {
     # Mindfulness y bienestar mental
@@ -137,20 +152,23 @@ async def scrape_categoria(
     scraper: CompensarPlaywrightScraper,
     categoria_slug: str,
     categoria_nombre: str,
-    subcategoria: str
+    subcategoria: str,
+    context=None
 ) -> list:
-    """Scrapea una subcategoría específica."""
-    try:
-        # El método scrape_category usa la URL base navegacion/category
-        productos = await scraper.scrape_category(
-            subcategoria=subcategoria,
-            categoria_principal=categoria_nombre,
-            fetch_detail_prices=False  # Más rápido sin precios detallados
-        )
-        return productos
-    except Exception as e:
-        print(f"   ⚠️ Error scrapeando {subcategoria}: {e}")
-        return []
+    """
+    Scrapea una subcategoría específica (en `context` si se da).
+    
+    Los errores se propagan: scrape_one los usa para reciclar el contexto
+    y gather(return_exceptions=True) los reporta por subcategoría.
+    """
+    # El método scrape_category usa la URL base navegacion/category
+    return await scraper.scrape_category(
+        subcategoria=subcategoria,
+        categoria_principal=categoria_nombre,
+        fetch_detail_prices=False,  # Más rápido sin precios detallados
+        context=context,
+        raise_errors=True
+    )
 
 
 async def scrape_all_categories(
@@ -159,7 +177,7 @@ async def scrape_all_categories(
 ) -> list:
     """
     Scrapea todas las categorías configuradas.
-    Más robusto: reinicia el navegador si hay errores.
+    Usa un solo navegador con un pool de contextos que se reciclan.
     
     Args:
         categorias: Dict de categorías a scrapear (default: todas)
@@ -187,80 +205,96 @@ async def scrape_all_categories(
             all_subcats.append((cat_slug, cat_nombre, subcat))
     
     print(f"\n📋 Total subcategorías a procesar: {len(all_subcats)}")
+    print(f"   En paralelo: {MAX_PARALLEL} (un navegador, contextos reciclados)")
     
-    # Procesar en batches, reiniciando navegador entre batches
-    batch_size = 5
+    pool = await BrowserPool.create(headless=headless, size=MAX_PARALLEL,
+                                    max_pages=CONTEXT_MAX_PAGES)
     
-    for i in range(0, len(all_subcats), batch_size):
-        batch = all_subcats[i:i + batch_size]
-        
-        print(f"\n{'='*60}")
-        print(f"🔄 Batch {i//batch_size + 1}/{(len(all_subcats) + batch_size - 1)//batch_size}")
-        print(f"   Procesando {len(batch)} subcategorías...")
-        print('='*60)
-        
-        scraper = CompensarPlaywrightScraper(headless=headless)
-        
+    # Todas las subcategorías a la vez; el pool deja correr MAX_PARALLEL.
+    # El jitter inicial escalona las cargas sin serializarlas
+    async def scrape_one(cat_slug: str, cat_nombre: str, subcat: str) -> list:
+        await asyncio.sleep(random.uniform(0, 1.5))
+        context = await pool.acquire()
+        failed = True
         try:
-            await scraper.start()
-            
-            for cat_slug, cat_nombre, subcat in batch:
-                try:
-                    productos = await scrape_categoria(scraper, cat_slug, cat_nombre, subcat)
-                    
-                    # Actualizar categoria_principal
-                    for p in productos:
-                        if hasattr(p, 'categoria_principal'):
-                            p.categoria_principal = cat_nombre
-                    
-                    all_productos.extend(productos)
-                    print(f"   ✅ {subcat}: {len(productos)} productos")
-                    
-                except Exception as e:
-                    print(f"   ❌ {subcat}: {str(e)[:50]}")
-                
-                # Pausa entre requests
-                await asyncio.sleep(2)
-            
-        except Exception as e:
-            print(f"   ⚠️ Error en batch: {e}")
+            productos = await scrape_categoria(pool.scraper, cat_slug, cat_nombre, subcat, context)
+            failed = False
         finally:
-            try:
-                await scraper.stop()
-            except:
-                pass
+            await pool.release(context, failed=failed)
+        
+        # Actualizar categoria_principal (scrape_category siempre devuelve Producto)
+        for p in productos:
+            p.categoria_principal = cat_nombre
         
-        # Pausa entre batches
-        if i + batch_size < len(all_subcats):
-            print("   💤 Pausa entre batches (3s)...")
-            await asyncio.sleep(3)
+        print(f"   ✅ {subcat}: {len(productos)} productos")
+        return productos
+    
+    try:
+        resultados = await asyncio.gather(
+            *(scrape_one(*item) for item in all_subcats),
+            return_exceptions=True
+        )
+    finally:
+        try:
+            await pool.close()
+        except:
+            pass
+    
+    for (cat_slug, cat_nombre, subcat), productos in zip(all_subcats, resultados):
+        if isinstance(productos, Exception):
+            print(f"   ❌ {subcat}: {str(productos)[:50]}")
+            continue
+        all_productos.extend(productos)
     
     return all_productos
 
 
-def save_productos(productos: list, filepath: str = "data/compensar/productos.json"):
-    """Guarda productos en JSON."""
+def _stable_id(p: dict) -> str:
+    """
+    ID estable de un producto: hash SHA-256 de (nombre normalizado,
+    subcategoría, URL).
+    
+    🎓 El `id` del scraper usa hash() de Python, que cambia entre procesos
+    (y cada worker del pool de parseo es otro proceso), y solo tiene 10.000
+    valores. Este ID es el mismo en cualquier ejecución, así que sirve
+    para deduplicar entre reintentos y re-ejecuciones.
+    """
+    key = json.dumps({
+        'n': ' '.join((p.get('nombre') or '').lower().split()),
+        's': p.get('subcategoria') or '',
+        'u': p.get('url') or '',
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def save_productos(productos: list, filepath: str = "data/compensar/productos.json",
+                   pretty: bool = False):
+    """
+    Guarda productos en JSON.
+    
+    Por defecto compacto (sin espacios): el único consumidor es --sync-only /
+    Supabase, que no necesita indentación. pretty=True indenta con 2 espacios.
+    """
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
     
-    # Convertir productos a dict si son objetos
-    productos_dict = []
+    # Calcular valor_numerico en lote para los productos recién scrapeados
+    normalize_prices([p for p in productos if hasattr(p, 'precio')])
+    
+    # Convertir a dict y eliminar duplicados por contenido en una sola pasada
+    # (el dict conserva el primero de cada clave, en orden de llegada)
+    unique = {}
     for p in productos:
         if hasattr(p, 'to_dict'):
-            productos_dict.append(p.to_dict())
+            d = p.to_dict()
         elif isinstance(p, dict):
-            productos_dict.append(p)
-    
-    # Eliminar duplicados por ID
-    seen = set()
-    unique = []
-    for p in productos_dict:
-        pid = p.get('id', p.get('nombre', ''))
-        if pid not in seen:
-            seen.add(pid)
-            unique.append(p)
+            d = p
+        else:
+            continue
+        unique.setdefault(_stable_id(d), d)
+    unique = list(unique.values())
     
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(unique, f, ensure_ascii=False, indent=2)
+    with open(filepath, 'wb') as f:
+        f.write(orjson.dumps(unique, option=orjson.OPT_INDENT_2 if pretty else 0))
     
     print(f"\n💾 Guardados {len(unique)} productos únicos en: {filepath}")
     return unique
@@ -272,27 +306,20 @@ def print_summary(productos: list):
     print("📊 RESUMEN DE SCRAPING")
     print("="*60)
     
-    # Contar por categoría
-    by_category = {}
-    by_subcategory = {}
-    
-    for p in productos:
-        if hasattr(p, 'categoria_principal'):
-            cat = p.categoria_principal
-            subcat = p.subcategoria
-        else:
-            cat = p.get('categoria_principal', 'Sin categoría')
-            subcat = p.get('subcategoria', 'sin subcategoría')
-        
-        by_category[cat] = by_category.get(cat, 0) + 1
-        by_subcategory[subcat] = by_subcategory.get(subcat, 0) + 1
+    # Contar por categoría (la lista es toda de objetos o toda de dicts)
+    if productos and hasattr(productos[0], 'categoria_principal'):
+        by_category = Counter(p.categoria_principal for p in productos)
+        by_subcategory = Counter(p.subcategoria for p in productos)
+    else:
+        by_category = Counter(p.get('categoria_principal', 'Sin categoría') for p in productos)
+        by_subcategory = Counter(p.get('subcategoria', 'sin subcategoría') for p in productos)
     
     print("\n📂 Por Categoría Principal:")
-    for cat, count in sorted(by_category.items(), key=lambda x: -x[1]):
+    for cat, count in by_category.most_common():
         print(f"   • {cat}: {count} productos")
     
     print("\n🏷️  Por Subcategoría:")
-    for subcat, count in sorted(by_subcategory.items(), key=lambda x: -x[1]):
+    for subcat, count in by_subcategory.most_common():
         print(f"   • {subcat}: {count} productos")
     
     print(f"\n📦 TOTAL: {len(productos)} productos")
@@ -321,6 +348,8 @@ Ejemplos:
                         help="Mostrar navegador (no headless)")
     parser.add_argument("--output", "-o", default="data/compensar/productos.json",
                         help="Archivo de salida JSON")
+    parser.add_argument("--pretty", action="store_true",
+                        help="JSON indentado (legible) en vez de compacto")
     parser.add_argument("--sync", "-s", action="store_true",
                         help="Sincronizar con Supabase después de scrapear")
     parser.add_argument("--sync-only", action="store_true",
@@ -383,7 +412,7 @@ Ejemplos:
         return
     
     # Guardar
-    productos = save_productos(productos, args.output)
+    productos = save_productos(productos, args.output, pretty=args.pretty)
     print_summary(productos)
     
     # Sincronizar con Supabase si se pidió
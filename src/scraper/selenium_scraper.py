@@ -3,8 +3,14 @@ Selenium-based Scraper for Compensar
 ====================================
 For JavaScript-rendered content that BeautifulSoup can't handle.
 Supports WSL with Windows Chrome/Brave browsers.
+
+When Playwright is installed (and no specific browser is requested), pages
+are rendered through the shared Playwright BrowserPool instead of a
+Selenium driver; the Selenium path remains as a fallback.
 """
 
+import asyncio
+
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
 from selenium.webdriver.firefox.service import Service as FirefoxService
@@ -21,11 +27,46 @@ import subprocess
 import time
 import logging
 import json
+import re
 import shutil
 import os
 
 logger = logging.getLogger(__name__)
 
+# Optional Playwright backend (preferred when available)
+try:
+    from src.scraper.compensar_playwright_scraper import BrowserPool, PLAYWRIGHT_AVAILABLE
+except ImportError:
+    PLAYWRIGHT_AVAILABLE = False
+
+# Price with optional "Desde:" prefix, e.g. "Desde: $65.000"
+_PRICE_RE = re.compile(r'(?:Desde:?\s*)?\$[\d.,]+')
+
+# Reads every product card in one execute_script call; mirrors the lookups
+# in _extract_product_data (src/href come back as resolved properties, like
+# WebElement.get_attribute does)
+_EXTRACT_CARDS_JS = """
+const text = el => (el && el.innerText || '').trim();
+return arguments[0].map(el => {
+    let name = null;
+    for (const tag of ['h2', 'h3', 'h4', 'h5']) {
+        const h = el.querySelector(tag);
+        if (h && text(h)) { name = text(h); break; }
+    }
+    const link = el.querySelector('a');
+    if (!name && text(link)) name = text(link);
+    const img = el.querySelector('img');
+    const desc = [...el.querySelectorAll('p')].find(p => text(p) && !p.innerText.includes('$'));
+    return {
+        name: name,
+        text: el.innerText || '',
+        image: img ? (img.src || img.getAttribute('data-src')) : null,
+        href: link ? link.href : null,
+        description: desc ? text(desc) : null,
+    };
+});
+"""
+
 
 def is_wsl() -> bool:
     """Check if running in WSL."""
@@ -83,11 +124,29 @@ class SeleniumCompensarScraper:
     Use this when the regular scraper doesn't find products
     (indicates JavaScript-rendered content).
     Supports WSL with Windows Chrome/Brave.
+    
+    With browser="auto" and Playwright installed, rendering is delegated to
+    CompensarPlaywrightScraper through a BrowserPool: one Chromium, several
+    contexts, categories scraped concurrently. Products keep this class's
+    dict format.
     """
     
     BASE_URL = "https://www.tiendacompensar.com"
     CATEGORY_URL = f"{BASE_URL}/navegacion/category"
     
+    # Contexts (concurrent categories) in the Playwright pool
+    PLAYWRIGHT_CONTEXTS = 4
+    
+    # Everything _find_product_elements may pick, counted in one JS call
+    CARD_COUNT_SELECTOR = ".product-card, .item-card, .service-card, [class*='product'], .card, .resultado, article"
+    
+    # URL patterns Chromium-based drivers never download (fonts, video, trackers)
+    BLOCKED_URL_PATTERNS = [
+        '*.woff', '*.woff2', '*.ttf', '*.otf',
+        '*.mp4', '*.webm',
+        '*google-analytics*', '*googletagmanager*', '*facebook.net*', '*doubleclick*',
+    ]
+    
     def __init__(self, headless: bool = True, browser: str = "auto"):
         """
         Initialize Selenium scraper.
@@ -101,6 +160,11 @@ class SeleniumCompensarScraper:
         self.driver = None
         self.scraped_data: List[Dict] = []
         self.is_wsl = is_wsl()
+        # Card selector that last matched; tried first on the next page
+        self._winning_selector: Optional[str] = None
+        # Playwright backend, set up by start() when used
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pool = None
     
     def _detect_browser(self) -> str:
         """Detect which browser is available."""
@@ -122,6 +186,14 @@ class SeleniumCompensarScraper:
         # Default to Chrome
         return "chrome"
     
+    def _block_heavy_resources(self, driver) -> None:
+        """Block BLOCKED_URL_PATTERNS through the DevTools protocol (Chromium only)."""
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.BLOCKED_URL_PATTERNS})
+        except Exception as e:
+            logger.warning(f"Could not block resources via CDP: {e}")
+    
     def _init_chrome_driver(self, binary_path: Optional[str] = None):
         """Initialize Chrome WebDriver."""
         options = ChromeOptions()
@@ -150,10 +222,13 @@ class SeleniumCompensarScraper:
         # Disable images for faster loading
         prefs = {"profile.managed_default_content_settings.images": 2}
         options.add_experimental_option("prefs", prefs)
+        # driver.get() returns at DOMContentLoaded; explicit waits cover the rest
+        options.page_load_strategy = 'eager'
         
         service = ChromeService(ChromeDriverManager().install())
         driver = webdriver.Chrome(service=service, options=options)
-        driver.implicitly_wait(10)
+        driver.implicitly_wait(0)  # Explicit waits only; missing elements fail fast
+        self._block_heavy_resources(driver)
         
         return driver
     
@@ -185,10 +260,13 @@ class SeleniumCompensarScraper:
         
         prefs = {"profile.managed_default_content_settings.images": 2}
         options.add_experimental_option("prefs", prefs)
+        # driver.get() returns at DOMContentLoaded; explicit waits cover the rest
+        options.page_load_strategy = 'eager'
         
         service = ChromeService(ChromeDriverManager().install())
         driver = webdriver.Chrome(service=service, options=options)
-        driver.implicitly_wait(10)
+        driver.implicitly_wait(0)  # Explicit waits only; missing elements fail fast
+        self._block_heavy_resources(driver)
         
         return driver
     
@@ -204,7 +282,7 @@ class SeleniumCompensarScraper:
         
         service = FirefoxService(GeckoDriverManager().install())
         driver = webdriver.Firefox(service=service, options=options)
-        driver.implicitly_wait(10)
+        driver.implicitly_wait(0)  # Explicit waits only; missing elements fail fast
         driver.set_window_size(1920, 1080)
         
         return driver
@@ -223,31 +301,97 @@ class SeleniumCompensarScraper:
             return self._init_chrome_driver()
     
     def start(self) -> None:
-        """Start the browser."""
-        if not self.driver:
-            self.driver = self._init_driver()
-            logger.info("Selenium driver started")
+        """Start the browser (Playwright pool if available, else Selenium)."""
+        if self.driver or self._pool:
+            return
+        if PLAYWRIGHT_AVAILABLE and self.browser == "auto":
+            # On WSL, drive the Windows Chrome install instead of a bundled Chromium
+            executable_path = get_windows_chrome_path() if self.is_wsl else None
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._pool = self._loop.run_until_complete(
+                    BrowserPool.create(headless=self.headless, size=self.PLAYWRIGHT_CONTEXTS,
+                                       executable_path=executable_path)
+                )
+                logger.info("Playwright browser pool started")
+                return
+            except Exception as e:
+                logger.warning(f"Playwright unavailable ({str(e).splitlines()[0]}), falling back to Selenium")
+                self._loop.close()
+                self._loop = None
+        self.driver = self._init_driver()
+        logger.info("Selenium driver started")
     
     def stop(self) -> None:
         """Stop the browser."""
+        if self._pool:
+            try:
+                self._loop.run_until_complete(self._pool.close())
+            finally:
+                self._loop.close()
+                self._pool = None
+                self._loop = None
+            logger.info("Playwright browser pool stopped")
         if self.driver:
             self.driver.quit()
             self.driver = None
             logger.info("Selenium driver stopped")
     
+    @staticmethod
+    def _producto_to_dict(producto, category: str) -> Dict:
+        """Convert a Playwright Producto into this scraper's product dict."""
+        return {
+            'category': category,
+            'name': producto.nombre,
+            'description': producto.descripcion,
+            'price': producto.precio.desde,
+            'price_from': producto.precio.es_desde,
+            'image_url': producto.imagen_url,
+            'product_url': producto.url
+        }
+    
+    async def _playwright_scrape_category(self, category: str) -> List[Dict]:
+        """Scrape one category in a pooled Playwright context."""
+        context = await self._pool.acquire()
+        failed = True
+        try:
+            productos = await self._pool.scraper.scrape_category(
+                category, "General", fetch_detail_prices=False, context=context,
+                raise_errors=True
+            )
+            failed = False
+        except Exception as e:
+            logger.error(f"Failed to scrape category {category}: {e}")
+            return []
+        finally:
+            # A failed context is closed and replaced instead of reused
+            await self._pool.release(context, failed=failed)
+        products = [self._producto_to_dict(p, category) for p in productos if p.nombre]
+        logger.info(f"Found {len(products)} products in {category}")
+        return products
+    
+    async def _playwright_scrape_all(self, categories: List[str]) -> List[List[Dict]]:
+        """Scrape all categories at once; the pool bounds concurrency."""
+        return await asyncio.gather(
+            *(self._playwright_scrape_category(c) for c in categories)
+        )
+    
     def scrape_category(self, category: str, scroll_times: int = 3) -> List[Dict]:
         """
         Scrape a category page with JavaScript rendering.
         
         Args:
             category: Category slug
-            scroll_times: Number of times to scroll for lazy loading
+            scroll_times: Number of times to scroll for lazy loading (Selenium
+                only; ignored on the Playwright path, which always scrolls to the bottom)
             
         Returns:
             List of product dictionaries
         """
-        if not self.driver:
+        if not (self.driver or self._pool):
             self.start()
+        if self._pool:
+            return self._loop.run_until_complete(self._playwright_scrape_category(category))
         
         url = f"{self.CATEGORY_URL}/{category}"
         logger.info(f"Selenium scraping: {url}")
@@ -262,28 +406,35 @@ class SeleniumCompensarScraper:
                 EC.presence_of_element_located((By.TAG_NAME, "body"))
             )
             
-            # Scroll to load lazy content
-            for _ in range(scroll_times):
+            # Wait for the first cards to render (pages load eagerly)
+            try:
+                WebDriverWait(self.driver, 10, poll_frequency=0.25).until(
+                    lambda d: self._card_count() > 0
+                )
+            except TimeoutException:
+                logger.debug(f"No product cards rendered in {url}")
+            
+            # Scroll to load lazy content, until a scroll stops adding cards
+            prev = self._card_count()
+            for _ in range(scroll_times * 2):
                 self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(1.5)
+                try:
+                    WebDriverWait(self.driver, 3, poll_frequency=0.25).until(
+                        lambda d: self._card_count() > prev
+                    )
+                except TimeoutException:
+                    break
+                prev = self._card_count()
             
             # Scroll back to top
             self.driver.execute_script("window.scrollTo(0, 0);")
-            time.sleep(0.5)
             
             # Try to find product cards with various selectors
             product_elements = self._find_product_elements()
-            
-            for element in product_elements:
-                try:
-                    product = self._extract_product_data(element, category)
-                    if product and product.get('name'):
-                        products.append(product)
-                except Exception as e:
-                    logger.warning(f"Error extracting product: {e}")
+            products.extend(self._extract_products(product_elements, category))
             
             # Handle pagination
-            products.extend(self._handle_pagination(category))
+            products.extend(self._handle_pagination(category, products))
             
         except TimeoutException:
             logger.error(f"Timeout loading {url}")
@@ -293,8 +444,19 @@ class SeleniumCompensarScraper:
         logger.info(f"Found {len(products)} products in {category}")
         return products
     
+    def _card_count(self) -> int:
+        """Number of elements matching CARD_COUNT_SELECTOR."""
+        return self.driver.execute_script(
+            "return document.querySelectorAll(arguments[0]).length;", self.CARD_COUNT_SELECTOR
+        )
+    
     def _find_product_elements(self):
-        """Find product elements using various selectors."""
+        """
+        Find product elements using various selectors.
+        
+        The selector that matched last time is tried first; all pages of
+        the site share a layout, so it usually wins with a single query.
+        """
         selectors = [
             ".product-card",
             ".item-card",
@@ -306,10 +468,15 @@ class SeleniumCompensarScraper:
             "article",
         ]
         
+        if self._winning_selector:
+            selectors.remove(self._winning_selector)
+            selectors.insert(0, self._winning_selector)
+        
         for selector in selectors:
             try:
                 elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
                 if elements and len(elements) > 1:  # More than 1 to avoid false positives
+                    self._winning_selector = selector
                     return elements
             except Exception:
                 continue
@@ -327,6 +494,53 @@ class SeleniumCompensarScraper:
         
         return []
     
+    def _extract_products(self, elements, category: str) -> List[Dict]:
+        """
+        Extract product data from many WebElements in one round-trip.
+        
+        Falls back to per-element extraction if the script fails.
+        """
+        if not elements:
+            return []
+        try:
+            cards = self.driver.execute_script(_EXTRACT_CARDS_JS, list(elements))
+        except Exception as e:
+            logger.warning(f"Batch extraction failed, falling back per element: {e}")
+            products = []
+            for element in elements:
+                try:
+                    product = self._extract_product_data(element, category)
+                    if product:
+                        products.append(product)
+                except Exception as e:
+                    logger.warning(f"Error extracting product: {e}")
+            return products
+        
+        products = []
+        for card in cards:
+            if not card['name']:
+                continue
+            product = {
+                'category': category,
+                'name': card['name'],
+                'description': card['description'],
+                'price': None,
+                'price_from': False,
+                'image_url': None,
+                'product_url': card['href'] or None
+            }
+            if '$' in card['text']:
+                price_match = _PRICE_RE.search(card['text'])
+                if price_match:
+                    product['price'] = price_match.group()
+                    if 'desde' in product['price'].lower():
+                        product['price_from'] = True
+            src = card['image']
+            if src:
+                product['image_url'] = src if src.startswith('http') else f"{self.BASE_URL}{src}"
+            products.append(product)
+        return products
+    
     def _extract_product_data(self, element, category: str) -> Optional[Dict]:
         """Extract product data from a Selenium WebElement."""
         product = {
@@ -364,8 +578,7 @@ class SeleniumCompensarScraper:
                 price_text = element.text
                 if '$' in price_text:
                     # Extract price portion
-                    import re
-                    price_match = re.search(r'(?:Desde:?\s*)?\$[\d.,]+', price_text)
+                    price_match = _PRICE_RE.search(price_text)
                     if price_match:
                         product['price'] = price_match.group()
                         if 'desde' in product['price'].lower():
@@ -406,9 +619,28 @@ class SeleniumCompensarScraper:
         
         return product if product.get('name') else None
     
-    def _handle_pagination(self, category: str) -> List[Dict]:
-        """Handle pagination for category pages."""
+    def _handle_pagination(self, category: str, first_page: List[Dict]) -> List[Dict]:
+        """
+        Handle pagination for category pages.
+        
+        Skipped when the first page had no products. Products already seen
+        (by name and URL) are dropped, and paging stops after two
+        consecutive pages with nothing new, e.g. when "next" keeps serving
+        the same page.
+        
+        Args:
+            category: Category slug
+            first_page: Products extracted from the first page
+            
+        Returns:
+            New products from the following pages
+        """
         additional_products = []
+        if not first_page:
+            return additional_products
+        
+        seen = {(p['name'], p['product_url']) for p in first_page}
+        pages_without_new = 0
         
         try:
             # Look for "next" or pagination buttons
@@ -428,10 +660,20 @@ class SeleniumCompensarScraper:
                         time.sleep(2)
                         
                         product_elements = self._find_product_elements()
-                        for element in product_elements:
-                            product = self._extract_product_data(element, category)
-                            if product and product.get('name'):
-                                additional_products.append(product)
+                        new_products = []
+                        for product in self._extract_products(product_elements, category):
+                            key = (product['name'], product['product_url'])
+                            if key not in seen:
+                                seen.add(key)
+                                new_products.append(product)
+                        
+                        if new_products:
+                            additional_products.extend(new_products)
+                            pages_without_new = 0
+                        else:
+                            pages_without_new += 1
+                            if pages_without_new >= 2:
+                                break
                         
                         # Look for next button again
                         next_buttons = self.driver.find_elements(
@@ -454,10 +696,15 @@ class SeleniumCompensarScraper:
         self.start()
         
         try:
-            for category in categories:
-                products = self.scrape_category(category)
-                all_products.extend(products)
-                time.sleep(2)  # Delay between categories
+            if self._pool:
+                results = self._loop.run_until_complete(self._playwright_scrape_all(categories))
+                for products in results:
+                    all_products.extend(products)
+            else:
+                for category in categories:
+                    products = self.scrape_category(category)
+                    all_products.extend(products)
+                    time.sleep(2)  # Delay between categories
         finally:
             self.stop()
         